@@ -1,4 +1,4 @@
-import torch, sys, logging, re, inspect, json, argparse
+import os, sys, time, math, asyncio, logging, re, inspect, json, argparse
 from types import * 
 from pathlib import Path
 
@@ -7,15 +7,141 @@ if base_path.__str__() not in sys.path:
     sys.path.append(base_path.__str__())
 
 from Color import Color as C
-from Utils import class_from_string, str2bool, valid_dir_path, parse_key_value_pairs
+from Utils import atomic_write, class_from_string, file_lock, qualified_name, resolve_class, str2bool, valid_dir_path, parse_key_value_pairs
 from log import setup_basic_logger
+import Stats
+
+class Range(object):
+    """
+    Numeric range constraint, e.g. Range(1e-5, 1e-1, log=True) for a learning rate or Range(16, 256, integer=True, q=16) for a batch size.
+    low, high (int or float): Inclusive bounds
+    log (bool): Sample uniformly in log space, requires low > 0
+    integer (bool): Values are ints, otherwise ints and floats are accepted
+    q (int or float): Values are multiples of q (quantized)
+    """
+
+    def __init__(self, low, high, log=False, integer=False, q=None):
+        if low > high:
+            raise ValueError(f"Range low ({low}) must not exceed high ({high})")
+        if log and low <= 0:
+            raise ValueError(f"Log range must have a positive lower bound, got {low}")
+        if q is not None and (q <= 0 or math.ceil(low / q) > math.floor(high / q)):
+            raise ValueError(f"Range [{low}, {high}] contains no multiples of q={q}")
+        self.low, self.high, self.log, self.integer, self.q = low, high, log, integer, q
+
+    def __contains__(self, item):
+        if isinstance(item, bool) or not isinstance(item, int if self.integer else (int, float)):
+            return False
+        if not self.low <= item <= self.high:
+            return False
+        return self.q is None or abs(item / self.q - round(item / self.q)) <= 1e-9
+
+    def from_unit(self, u):
+        """Maps u, uniform in [0, 1), onto the range."""
+        if self.log:
+            value = math.exp(math.log(self.low) + u * (math.log(self.high + self.integer) - math.log(self.low)))
+        else:
+            value = self.low + u * (self.high + self.integer - self.low)
+        if self.q is not None:
+            value = min(max(round(value / self.q), math.ceil(self.low / self.q)), math.floor(self.high / self.q)) * self.q
+        elif self.integer:
+            value = min(math.floor(value), self.high)
+        return int(round(value)) if self.integer else value
+
+    def sample(self, rng):
+        """Draws one value using 'rng' (random.Random)."""
+        return self.from_unit(rng.random())
+
+    def sample_many(self, rng, n):
+        """Draws 'n' values at once using 'rng' (numpy.random.Generator), as a NumPy array."""
+        import numpy as np
+        u = rng.random(n)
+        if self.log:
+            values = np.exp(np.log(self.low) + u * (np.log(self.high + self.integer) - np.log(self.low)))
+        else:
+            values = self.low + u * (self.high + self.integer - self.low)
+        if self.q is not None:
+            values = np.clip(np.round(values / self.q), math.ceil(self.low / self.q), math.floor(self.high / self.q)) * self.q
+        elif self.integer:
+            values = np.minimum(np.floor(values), self.high)
+        return np.round(values).astype(np.int64) if self.integer else values
+
+    def to_dict(self):
+        return {"low": self.low, "high": self.high, "log": self.log, "integer": self.integer, "q": self.q}
+
+    def __eq__(self, other):
+        return isinstance(other, Range) and self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(self.to_dict().values()))
+
+    def __repr__(self):
+        return f"Range({', '.join(f'{k}={v}' for k, v in self.to_dict().items())})"
+
+_module_index = {} # '{module}=={version}' -> [(class name, description)], shared by every BluePrint in this process
+
+def module_version(module):
+    """
+    Version used to key the module index, so entries are rebuilt when a module changes.
+    Output:
+        Version of the module's package, or the modification time and size of the module's file if it is unversioned.
+        None if neither is known (e.g. modules created at runtime), these are never indexed
+    """
+    version = getattr(module, "__version__", None)
+    if version is None:
+        from importlib import metadata
+        try:
+            version = metadata.version(module.__name__.split(".")[0])
+        except (metadata.PackageNotFoundError, ValueError):
+            path = getattr(module, "__file__", None)
+            if path is None or not os.path.exists(path):
+                return None
+            stat = os.stat(path)
+            version = f"mtime={stat.st_mtime_ns},size={stat.st_size}"
+    return str(version)
+
+def compile_patterns(patterns):
+    """Single regex matching any of 'patterns' (a regex or list of regexes), None if there are none."""
+    if patterns is None:
+        return None
+    patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+def compile_constraint(constraint):
+    """
+    Compiles a constraint into a validator, so it does not have to be re-interpreted on every check.
+    Input:
+        Constraint (list of classes, type, Range or value)
+    Output:
+        Function taking an item and returning whether it satisfies the constraint
+    """
+    if type(constraint) is list:
+        try:
+            options = frozenset(constraint) # Classes hash by identity, so membership is a single lookup
+        except TypeError:
+            return lambda item: item in constraint
+        def validator(item):
+            try:
+                return item in options
+            except TypeError: # Unhashable item can not be one of the options
+                return False
+        return validator
+    elif type(constraint) is type:
+        return lambda item: type(item) is constraint
+    elif isinstance(constraint, Range):
+        return constraint.__contains__
+    else:
+        return lambda item: item == constraint
 
 class BluePrint(object):
     dirPath = None
+    module_index_path = None # Index of module classes, see get_module_classes. Defaults to BluePrint.dirPath / 'module_index.json'
 
-    def __init__(self, id, load_existing=False, custom_dir=None, skip_prompts=False, log_level=logging.INFO, **kwargs):
+    def __init__(self, id, load_existing=False, custom_dir=None, skip_prompts=False, log_level=logging.INFO, include=None, exclude=None, **kwargs):
         self.id = id
         self.skip_prompts = skip_prompts
+        self._validators = {} # Key -> compiled constraint, see check
+        self._include, self._exclude = include, exclude # Default class name patterns for modules, see get_module_classes
         self.logger = setup_basic_logger(custom_dir, log_level, f"blueprints_{id}.log")
         if BluePrint.dirPath is None:
             BluePrint.dirPath = Path.cwd() / "BluePrints" if custom_dir is None else custom_dir
@@ -29,9 +155,10 @@ class BluePrint(object):
             self._update_variables(k,v) 
     
     def _update_variables(self, k, v):
+        self._validators.pop(k, None)
         if isinstance(v, ModuleType):
             vars(self).update({k:self.get_module_classes(v)})
-        elif type(v) is type:
+        elif type(v) is type or isinstance(v, Range):
             vars(self).update({k:v})
         elif type(v) is list:
             for elt in v:
@@ -40,31 +167,66 @@ class BluePrint(object):
                     raise ValueError(msg)
             vars(self).update({k:v})
         else:
-            self.logger.error(msg := f"Value '{v}' for key '{k}' has type {type(v)}, should be Module, List or Type.")
+            self.logger.error(msg := f"Value '{v}' for key '{k}' has type {type(v)}, should be Module, List, Type or Range.")
             raise TypeError(msg)
     
     def save(self, dirPath):
+        start = time.perf_counter()
         with open(dirPath / f"BluePrint_{self.id}.json", "w") as f:
              print(dirPath / f"BluePrint_{self.id}.json")
              json.dump(self, f, cls=BluePrintEncoder)
+             nbytes = f.tell()
+        if Stats.enabled: Stats.record("blueprint.save", time.perf_counter() - start, nbytes)
         return self
 
     def load(self, dirPath):
+        start = time.perf_counter()
         with open(dirPath / f"BluePrint_{self.id}.json", "r") as f:#
             kwargs = json.load(f, cls=BluePrintDecoder)
+            nbytes = f.tell()
+        if Stats.enabled: Stats.record("blueprint.load", time.perf_counter() - start, nbytes)
         vars(self).update(kwargs)
+        self._validators.clear()
         return self
 
-    def get_module_classes(self, module):
+    async def asave(self, dirPath):
+        """Coroutine version of save, the file is written in a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.save, dirPath)
+
+    async def aload(self, dirPath):
+        """Coroutine version of load, the file is read in a worker thread so the event loop is not blocked."""
+        return await asyncio.to_thread(self.load, dirPath)
+
+    def constraints(self):
+        """Constraints of this BluePrint, without the id, logger and other bookkeeping attributes."""
+        return {k: v for k, v in vars(self).items() if k not in ["id", "skip_prompts", "logger"] and not k.startswith("_")}
+
+    def get_module_classes(self, module, include=None, exclude=None):
+        """
+        Classes of a module that can be chosen for a hyper-parameter, private classes (leading or trailing '_') are left out.
+        Classes are selected by name with regex patterns (matched with re.search), or interactively if neither
+        'include' nor 'exclude' is given and prompts are not skipped.
+        The class names of every (versioned) module are kept in a JSON index at BluePrint.module_index_path,
+        shared across processes, so large modules are only scanned once per version.
+        Input:
+            module (ModuleType): Module to take classes from
+            include (str or list): Only keep classes whose name matches one of these patterns, defaults to the BluePrint's 'include'
+            exclude (str or list): Leave out classes whose name matches one of these patterns, defaults to the BluePrint's 'exclude'
+        Output:
+            List of classes
+        """
+        include = self._include if include is None else include
+        exclude = self._exclude if exclude is None else exclude
+        members = self._module_members(module)
+        if include is not None or exclude is not None:
+            include, exclude = compile_patterns(include), compile_patterns(exclude)
+            return [getattr(module, name) for name, _ in members
+                    if (include is None or include.search(name)) and (exclude is None or not exclude.search(name))]
         cls_dict = {}
-        for count, (name, cls) in enumerate(inspect.getmembers(module, inspect.isclass)):
-            if re.search("__", name) or re.search("^_|_$", name):
-                continue
-            desc = cls.__doc__
-            desc = "No Description Found" if desc is None else desc.split("\n")[0]
+        for count, (name, desc) in enumerate(members):
             if not self.skip_prompts:
                 print(f"{count}: {C.BOLD}{name}{C.END} ({desc})")
-            cls_dict[count] = cls
+            cls_dict[count] = getattr(module, name)
         resp = "x" if self.skip_prompts else input("Provide digit (e.g. 3), or list of digits (e.g. 2,4,6), of elements to IGNORE. 'x' to exit")
         while resp != "x":
             numbers = resp.split(",")
@@ -82,19 +244,96 @@ class BluePrint(object):
                 desc = "No Description Found" if desc is None else  desc.split("\n")[0]
                 print(f"{count}: {C.BOLD}{cls.__name__}{C.END} ({desc})")
             resp = input("Provide digit or list of digits to ignore, 'x' to exit")
-        return [class_from_string(f"{module.__name__}.{cls.__name__}") for cls in cls_dict.values()]
+        return list(cls_dict.values())
+
+    def _module_members(self, module):
+        """(name, description) of every public class in 'module', from the module index if it is up to date."""
+        version = module_version(module)
+        key = f"{module.__name__}=={version}"
+        members = _module_index.get(key)
+        if members is None and version is not None:
+            members = self._read_module_index().get(key)
+        if members is not None and not all(hasattr(module, name) for name, _ in members): # Stale, e.g. module edited in place
+            members = None
+        if members is None:
+            if Stats.enabled: Stats.count("blueprint.module_index.misses")
+            members = []
+            for name, cls in inspect.getmembers(module, inspect.isclass):
+                if "__" in name or name.startswith("_") or name.endswith("_"):
+                    continue
+                desc = cls.__doc__
+                members.append((name, "No Description Found" if desc is None else desc.split("\n")[0]))
+            if version is not None:
+                index_path = self._module_index_path()
+                with file_lock(f"{index_path}.lock"): # Merge with modules other processes added, without losing theirs
+                    index = self._read_module_index()
+                    index[key] = members
+                    atomic_write(index_path, json.dumps(index, indent=1).encode())
+                self.logger.info(f"Indexed {len(members)} classes of module '{module.__name__}' (version {version}) at: {index_path}")
+        elif Stats.enabled: Stats.count("blueprint.module_index.hits")
+        if version is not None:
+            _module_index[key] = members
+        return members
+
+    @staticmethod
+    def _module_index_path():
+        path = Path(BluePrint.dirPath if BluePrint.module_index_path is None else BluePrint.module_index_path)
+        return path / "module_index.json" if path.is_dir() else path
+
+    def _read_module_index(self):
+        try:
+            with open(self._module_index_path(), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def validator(self, key):
+        """
+        Compiled constraint for 'key', cached until the constraint is replaced.
+        Note that mutating a list constraint in place (e.g. bp["key"].append(cls)) is not picked up, assign a new list instead.
+        """
+        validator = self._validators.get(key)
+        if validator is None:
+            if key not in self:
+                self.logger.error(msg := f"'{key}' not in BluePrint '{self.id}'")
+                raise KeyError(msg)
+            validator = self._validators[key] = compile_constraint(self[key])
+        return validator
 
     def check(self, key, item):
-        if key not in self:
-            self.logger.error(msg := f"'{key}' not in BluePrint '{self.id}'")
-            raise KeyError(msg)
-        constraint = self[key]
-        if type(constraint) is list:
-            return True if item in constraint else False
-        elif type(constraint) is type:
-            return True if type(item) is constraint else False
-        else:
-            return True if item == constraint else False
+        item = resolve_class(item) # Constraints hold the classes themselves, not LazyClasses
+        if not Stats.enabled:
+            return self.validator(key)(item)
+        Stats.count("blueprint.check")
+        if not (valid := self.validator(key)(item)):
+            Stats.count("blueprint.check.failures")
+        return valid
+
+    def check_many(self, configs):
+        """
+        Validates many candidate configurations in one call, without constructing HyperParameters.
+        Input:
+            Iterable of dictionaries mapping keys to values
+        Output:
+            List of booleans, True where every key of the configuration is in the BluePrint and satisfies its constraint
+        """
+        if Stats.enabled: Stats.count("blueprint.check_many")
+        validators = {}
+        mask = []
+        for config in configs:
+            valid = True
+            for key, item in config.items():
+                validator = validators.get(key)
+                if validator is None:
+                    if key not in self:
+                        valid = False
+                        break
+                    validator = validators[key] = self.validator(key)
+                if not validator(resolve_class(item)):
+                    valid = False
+                    break
+            mask.append(valid)
+        return mask
 
     def __getitem__(self, key):
         try:
@@ -113,7 +352,7 @@ class BluePrint(object):
     def __eq__(self, other):
         x, y = vars(self), vars(other)
         for k in {**x, **y}.keys():
-            if k == "id": continue
+            if k == "id" or k.startswith("_"): continue
             if k not in x or k not in y: return False
             if x[k] != y[k]: return False
         return True
@@ -121,7 +360,7 @@ class BluePrint(object):
     def __str__(self):
         info_str = f">>> {C.BOLD}BluePrint {self.id}{C.END} <<<"
         for key, value in vars(self).items():
-            if key in inspect.signature(self.__init__).parameters.keys(): continue  # Ignore __init__ signature params
+            if key in inspect.signature(self.__init__).parameters.keys() or key.startswith("_"): continue  # Ignore __init__ signature params
             info_str += f"\n{C.BOLD}{key}{C.END}={value.__name__ if isinstance(value, (ModuleType, type)) else value}" # ToDo: Pretty Print 
         return info_str
 
@@ -130,8 +369,9 @@ class BluePrintEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, BluePrint):
             template = {"id": "default", "__modules__":[],
-                        "__types__":[], "__values__":[], "__lists__":[]}
+                        "__types__":[], "__values__":[], "__lists__":[], "__ranges__":[]}
             for k, v in vars(obj).items():
+                if k.startswith("_"): continue
                 if k == "id":
                     template["id"] = v
                 elif isinstance(v, ModuleType):
@@ -141,7 +381,9 @@ class BluePrintEncoder(json.JSONEncoder):
                 elif type(v) in [str, int, bool, float]:
                     template["__values__"].append((k,v))
                 elif type(v) is list:
-                    template["__lists__"].append((k, [f"{m.__module__}.{m.__name__}" for m in v]))
+                    template["__lists__"].append((k, [qualified_name(m) for m in v]))
+                elif isinstance(v, Range):
+                    template["__ranges__"].append((k, v.to_dict()))
             return template
         return json.JSONEncoder.default(self, obj)
 
@@ -154,12 +396,13 @@ class BluePrintDecoder(json.JSONDecoder):
         if "__modules__" in dct: # Is BluePrint
             kwargs = {}
             for k, v in dct["__modules__"] + dct["__types__"]:
-                # ToDo: Add Import Statement + Error Handling
-                kwargs[k] = eval(v)
+                kwargs[k] = class_from_string(v)
             for k, v in dct["__values__"]:
                 kwargs[k] = v
             for k, v in dct["__lists__"]:
                 kwargs[k] = [class_from_string(m) for m in v]
+            for k, v in dct.get("__ranges__", []): # Not in BluePrints saved before ranges were supported
+                kwargs[k] = Range(**v)
             return kwargs
         return dct
 
@@ -184,6 +427,7 @@ if __name__ == "__main__":
     # Additional params here are fallbacks if no args.set provided
     if args.set is None: # Show examples
         print("No key-value pairs provided, showing examples.")
+        import torch # Only needed for the example, importing torch is slow
         kwargs = parse_key_value_pairs(args.set, no_epochs=int, epsilon=float, shuffle=bool, optimizer=torch.optim)
     else:
         kwargs = parse_key_value_pairs(args.set)
@@ -0,0 +1,101 @@
+import os, re, sys, time, pickle, hashlib, functools
+from collections import namedtuple
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from Utils import atomic_write
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "entries", "size"])
+
+def memoize(cache_dir, keys=None, max_entries=None, max_bytes=None, max_age=None, version=None):
+    """
+    Decorator Factory, caches the return value of a trial function on disk.
+    The function's first argument must be HyperParameters, entries are keyed by the function's qualified name,
+    the fingerprint of those HyperParameters (restricted to 'keys') and any further arguments.
+    Example Use:
+        @memoize("cache", keys=["batch_size", "dataset"], max_age=7 * 24 * 3600)
+        def preprocess(hparams): ...
+    cache_dir (path-like): Folder to store cached results in, each function gets its own sub-folder
+    keys (iterable): Hyper-parameters the function depends on, configurations that only differ in other keys share entries.
+        Defaults to all hyper-parameters.
+    max_entries (int): Maximum number of cached results, least recently used are evicted first
+    max_bytes (int): Maximum total size of cached results, least recently used are evicted first
+    max_age (float): Seconds after which a cached result is stale, counted from when it was computed (not last used)
+    version (str): Change to invalidate results cached by a previous version of the function
+    Return values must be picklable. Cache hits and misses are counted, see wrapper.cache_info().
+    """
+    keys = None if keys is None else sorted(keys)
+    def decorator(func):
+        """Wraps an on-disk cache around any passed function."""
+        directory = Path(cache_dir) / re.sub(r"[^\w.]", "_", f"{func.__module__}.{func.__qualname__}") # E.g. '<locals>'
+        directory.mkdir(parents=True, exist_ok=True)
+        stats = {"hits": 0, "misses": 0}
+
+        @functools.wraps(func)
+        def wrapper(hparams, *args, **kwargs):
+            key = hparams.fingerprint(keys)
+            if args or kwargs or version is not None:
+                key = hashlib.sha256(key.encode() + pickle.dumps((version, args, sorted(kwargs.items())))).hexdigest()
+            path = directory / f"{key}.pkl"
+            try:
+                stat = path.stat()
+                if max_age is None or time.time() - stat.st_mtime <= max_age:
+                    with open(path, "rb") as f:
+                        result = pickle.load(f)
+                    os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns)) # Access time records the last use, for eviction
+                    stats["hits"] += 1
+                    return result
+            except FileNotFoundError: # Not cached, or evicted by another process
+                pass
+            stats["misses"] += 1
+            result = func(hparams, *args, **kwargs)
+            atomic_write(path, pickle.dumps(result))
+            _evict(directory, max_entries, max_bytes, max_age)
+            return result
+
+        def cache_info():
+            entries = _entries(directory)
+            return CacheInfo(stats["hits"], stats["misses"], len(entries), sum(entry[1] for entry in entries))
+
+        def cache_clear():
+            for path, *_ in _entries(directory):
+                path.unlink(missing_ok=True)
+            stats.update(hits=0, misses=0)
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
+
+def _entries(directory):
+    """
+    (path, size, modification time, last use) of every cached result in 'directory', least recently used first.
+    The modification time is when the result was computed, its access time when it was last used (see memoize).
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError: # Evicted by another process
+                continue
+            entries.append((Path(entry.path), stat.st_size, stat.st_mtime, max(stat.st_atime, stat.st_mtime)))
+    return sorted(entries, key=lambda entry: entry[3])
+
+def _evict(directory, max_entries, max_bytes, max_age):
+    if max_entries is None and max_bytes is None and max_age is None:
+        return
+    entries, expired = _entries(directory), []
+    if max_age is not None:
+        now = time.time()
+        expired = [entry for entry in entries if now - entry[2] > max_age]
+        entries = [entry for entry in entries if now - entry[2] <= max_age]
+    size = sum(entry[1] for entry in entries)
+    while entries and ((max_entries is not None and len(entries) > max_entries) or (max_bytes is not None and size > max_bytes)):
+        expired.append(entry := entries.pop(0))
+        size -= entry[1]
+    for path, *_ in expired:
+        path.unlink(missing_ok=True)
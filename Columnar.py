@@ -0,0 +1,210 @@
+import sys, json, inspect, numbers
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from HyperParameters import HyperParameters
+from Utils import LazyClass, atomic_write, class_from_string, qualified_name
+"""
+Columnar export of many HyperParameters (and their trial results) to one '.npy' file per key, for vectorized analysis.
+Numeric and bool values are stored as plain arrays, classes and strings are dictionary-encoded (an int32 code per row,
+-1 if missing, plus a table of categories in the manifest). Every column can be memory-mapped, so opening
+a large export is instant and only the rows that are touched are read. Requires NumPy.
+Example Use:
+    export_columns(HyperParameters.load_all(bp), "sweep_columns", results={r.id: r.result for r in run_trials(...)})
+    table = open_columns("sweep_columns")
+    mask = table.equals("optimizer", torch.optim.Adam) & (table["lr"] < 1e-3)
+    best = table.ids[mask][table["result"][mask].argmin()]
+"""
+MANIFEST = "columns.json"
+VERSION = 1
+
+def _numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("Columnar export requires NumPy, install it with 'pip install numpy'") from e
+    return np
+
+def _kind(value):
+    """Column kind of a single value, None for values that are not exported (like HyperParametersEncoder)."""
+    if type(value) is bool:
+        return "bool"
+    elif isinstance(value, numbers.Integral):
+        return "int"
+    elif isinstance(value, numbers.Real):
+        return "float"
+    elif type(value) is str:
+        return "str"
+    elif inspect.isclass(value) or isinstance(value, LazyClass):
+        return "class"
+    return None
+
+def _encode(np, key, values):
+    """Array and manifest entry of one column, 'values' has None for missing rows."""
+    kinds = {_kind(v) for v in values} - {None}
+    values = [v if _kind(v) is not None else None for v in values]
+    missing = any(v is None for v in values)
+    if not kinds:
+        return None, None
+    elif kinds <= {"str"} or kinds <= {"class"}:
+        kind = kinds.pop()
+        names = [None if v is None else (v if kind == "str" else qualified_name(v)) for v in values]
+        categories = sorted(set(names) - {None})
+        codes = {name: i for i, name in enumerate(categories)}
+        return np.array([-1 if name is None else codes[name] for name in names], dtype=np.int32), {"kind": kind, "categories": categories}
+    elif kinds == {"bool"} and not missing:
+        return np.array(values, dtype=np.bool_), {"kind": "bool"}
+    elif kinds == {"int"} and not missing:
+        return np.array(values, dtype=np.int64), {"kind": "int"}
+    elif kinds <= {"bool", "int", "float"}: # Missing values become NaN, ints and bools are restored by ColumnTable.decode
+        kind = kinds.pop() if len(kinds) == 1 else "float"
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64), {"kind": kind}
+    raise TypeError(f"Values of key '{key}' have mixed kinds {sorted(kinds)}, they can not be stored in one column")
+
+def export_columns(hparams, path, results=None):
+    """
+    Writes HyperParameters and their results to the directory 'path', see open_columns.
+    Input:
+        hparams (iterable): HyperParameters to export, e.g. HyperParameters.load_all(bp)
+        path (path-like): Directory to write to, created if needed. Columns of a previous export are replaced
+        results (dict): Optional id -> trial result, either a dictionary of metrics or a single number (stored as 'result').
+            Metric names must not clash with hyper-parameter keys
+    Output:
+        Number of rows written
+    """
+    np = _numpy()
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    ids, columns = [], {}
+    for row, h in enumerate(hparams):
+        ids.append(h.id)
+        for k, v in h.to_dict().items():
+            columns.setdefault(k, [None] * row).append(v)
+        for column in columns.values(): # Keys this row does not have
+            if len(column) == row:
+                column.append(None)
+    metrics = {}
+    for row, id in enumerate(ids):
+        result = (results or {}).get(id)
+        for k, v in (result.items() if isinstance(result, dict) else [("result", result)] if result is not None else []):
+            if k in columns:
+                raise ValueError(f"Metric '{k}' clashes with a hyper-parameter of the same name")
+            metrics.setdefault(k, [None] * len(ids))[row] = v
+
+    (path / MANIFEST).unlink(missing_ok=True) # Export is incomplete until the manifest is written again
+    for old in path.glob("column_*.npy"):
+        old.unlink()
+    manifest = {"version": VERSION, "rows": len(ids), "ids": "ids.npy", "columns": {}, "metrics": sorted(metrics)}
+    np.save(path / "ids.npy", np.array(ids, dtype=str))
+    for i, (k, values) in enumerate(sorted({**columns, **metrics}.items())):
+        array, entry = _encode(np, k, values)
+        if array is None: continue
+        np.save(path / (file_name := f"column_{i}.npy"), array)
+        manifest["columns"][k] = {"file": file_name, **entry}
+    atomic_write(path / MANIFEST, json.dumps(manifest, indent=1).encode())
+    return len(ids)
+
+class ColumnTable(object):
+    """
+    Columns written by export_columns, opened with open_columns.
+    table[key] is the raw array of a column (codes for class and str columns), table.ids the array of ids.
+    """
+
+    def __init__(self, path, mmap_mode="r"):
+        np = self._np = _numpy()
+        self.path = Path(path)
+        with open(self.path / MANIFEST, "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest["version"] > VERSION:
+            raise ValueError(f"Columns at {self.path} have version {self.manifest['version']}, only up to {VERSION} is supported")
+        self.mmap_mode = mmap_mode
+        self.ids = np.load(self.path / self.manifest["ids"], mmap_mode=mmap_mode)
+        self.metrics = self.manifest["metrics"]
+        self._arrays = {}
+
+    def __getitem__(self, key):
+        if key not in self._arrays:
+            if key not in self.manifest["columns"]:
+                raise KeyError(f"'{key}' not in columns at {self.path}")
+            self._arrays[key] = self._np.load(self.path / self.manifest["columns"][key]["file"], mmap_mode=self.mmap_mode)
+        return self._arrays[key]
+
+    def __contains__(self, key):
+        return key in self.manifest["columns"]
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def keys(self):
+        return list(self.manifest["columns"])
+
+    def kind(self, key):
+        """One of 'bool', 'int', 'float', 'str' or 'class'. Int and bool columns with missing values are stored as floats (NaN if missing)."""
+        return self.manifest["columns"][key]["kind"]
+
+    def categories(self, key):
+        """Qualified class names (or strings) of a dictionary-encoded column, indexed by code."""
+        return self.manifest["columns"][key]["categories"]
+
+    def code(self, key, value):
+        """Code of a class (or string) in a dictionary-encoded column, -1 if it never occurs."""
+        name = value if type(value) is str else qualified_name(value)
+        try:
+            return self.categories(key).index(name)
+        except ValueError:
+            return -1
+
+    def equals(self, key, value):
+        """Boolean mask of the rows where 'key' is 'value', compares codes for class and str columns."""
+        if self.kind(key) in ["class", "str"]:
+            code = self.code(key, value)
+            return self[key] == code if code != -1 else self._np.zeros(len(self), dtype=bool)
+        return self[key] == value
+
+    def decode(self, key, lazy=True):
+        """Column 'key' as an object array of Python values, classes are resolved (see Utils.class_from_string for 'lazy')."""
+        np, column, kind = self._np, self[key], self.kind(key)
+        if kind in ["int", "bool"] and column.dtype == np.float64: # Stored with NaN for missing values
+            values = np.empty(len(column), dtype=object)
+            values[:] = [None if v != v else (int(v) if kind == "int" else bool(v)) for v in column.tolist()]
+            return values
+        if kind not in ["class", "str"]:
+            return column
+        values = [None] + [class_from_string(name, lazy) if self.kind(key) == "class" else name for name in self.categories(key)]
+        table = np.empty(len(values), dtype=object)
+        table[:] = values
+        return table[np.asarray(column) + 1] # Code -1 (missing) maps to None
+
+    def rows(self, mask=None, lazy=True):
+        """
+        Yields (id, values) of every row, or only those where 'mask' is True, with values decoded to Python objects.
+        Missing values are left out, as are metrics (see ColumnTable.metrics).
+        """
+        np = self._np
+        index = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        columns = {k: self.decode(k, lazy)[index].tolist() for k in self.keys() if k not in self.metrics}
+        for row, id in enumerate(self.ids[index].tolist()):
+            yield id, {k: v for k, values in columns.items() if not self._missing(v := values[row])}
+
+    def to_hyperparameters(self, blueprint, mask=None, lazy=True):
+        """Lazily rebuilds HyperParameters for every row (or those where 'mask' is True), bypassing BluePrint checks."""
+        for id, values in self.rows(mask, lazy):
+            yield HyperParameters(id, blueprint)._apply(values)
+
+    @staticmethod
+    def _missing(value):
+        return value is None or (type(value) is float and value != value) # NaN
+
+def open_columns(path, mmap_mode="r"):
+    """
+    Opens columns written by export_columns.
+    Input:
+        path (path-like): Directory passed to export_columns
+        mmap_mode (str): Memory-map mode passed to numpy.load, None to read columns into memory
+    Output:
+        ColumnTable
+    """
+    return ColumnTable(path, mmap_mode)
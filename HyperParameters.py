@@ -1,4 +1,8 @@
-import torch, sys, inspect, json, logging, argparse
+import os, sys, time, uuid, asyncio, inspect, json, logging, argparse, hashlib, threading, weakref
+from bisect import bisect_left
+from collections import ChainMap, deque
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 from types import * 
 from pathlib import Path
 
@@ -7,25 +11,92 @@ if base_path.__str__() not in sys.path:
     sys.path.append(base_path.__str__())
 
 from Color import Color as C
-from BluePrint import BluePrint, BluePrintEncoder, BluePrintDecoder
-from Utils import class_from_string, str2bool, valid_dir_path, parse_key_value_pairs
+from BluePrint import BluePrint, BluePrintEncoder, BluePrintDecoder, Range
+from Utils import LazyClass, atomic_write, class_from_string, qualified_name, resolve_class, str2bool, valid_dir_path, parse_key_value_pairs
 from log import setup_basic_logger
+import Stats
+
+@lru_cache(maxsize=None)
+def class_binder(cls):
+    """
+    Precompiled binder for a class, computed once per class and cached for the lifetime of the process.
+    Input:
+        Class
+    Output:
+        Tuple of (name, default) pairs for every parameter in the class signature that has a default value
+    """
+    return tuple((param.name, param.default) for param in inspect.signature(cls).parameters.values()
+                 if param.default is not inspect.Parameter.empty)
+
+def _bounded_map(fn, items, max_workers=None, max_in_flight=None):
+    """
+    Like ThreadPoolExecutor.map, but only takes the next item from 'items' once fewer than 'max_in_flight' (defaults
+    to twice the workers) are submitted and not yet yielded, so memory does not grow with the length of 'items'.
+    """
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4) # ThreadPoolExecutor's default
+    max_in_flight = max_in_flight or 2 * max_workers
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = deque()
+        for item in items:
+            if len(futures) >= max_in_flight:
+                yield futures.popleft().result()
+            futures.append(pool.submit(fn, item))
+        while futures:
+            yield futures.popleft().result()
+
+def fingerprint(template, keys=None):
+    """
+    Stable content hash of a saved HyperParameters, independent of its id and of key order.
+    Input:
+        template (dict): HyperParameters in the HyperParametersEncoder format, e.g. json.load of 'HyperParameters_{id}.json'
+        keys (iterable): Only hash these hyper-parameters, defaults to all of them
+    Output:
+        Hex digest (str)
+    """
+    keys = None if keys is None else set(keys)
+    canonical = {section: sorted([k, v] for k, v in template[section] if keys is None or k in keys)
+                 for section in ["__classes__", "__primitives__"]}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
 
 class HyperParameters(object):
+    """
+    Hyper-parameter values of one configuration, checked against a BluePrint.
+    With 'base', only the values passed (or set) on this instance are stored in it, all others are looked up in the
+    base HyperParameters (like collections.ChainMap), so many overlays can share one base. Changes to the base are
+    seen by its overlays. Overlays share the BluePrint (unless another is given) and logger of their base.
+    """
     dirPath = None
+    _loaded_bases = weakref.WeakValueDictionary() # (file, modification time, lazy) -> base loaded for overlays, see load
+    _loaded_bases_lock = threading.RLock() # Re-entered when a base is itself saved with delta=True
 
-    def __init__(self, id, blueprint, load_existing=False, custom_dir=None, log_level=logging.INFO, **kwargs):
+    def __init__(self, id, blueprint=None, load_existing=False, custom_dir=None, log_level=logging.INFO, base=None, **kwargs):
         self.id = id
-        self.logger = setup_basic_logger(custom_dir, log_level, f"hyperparameters_{id}")
+        self._bound_kwargs = {} # Class -> kwargs bound from this instance, see fetch_class_hyperparameters
+        self._factories = {} # Key -> factory of the class it holds, see factory
+        self._dirty = set() # Keys changed since the last save or load
+        self._saved_path = None # File this instance was last saved to or loaded from
+        self._generation = None # Token of that file's version, changes appended to its change log carry it too
+        self._base = None # HyperParameters values not set on this instance are looked up in
+        self._overlays = None # Overlays using this instance as base, id -> overlay (weak), created when first needed
+        if base is not None:
+            self.logger = base.logger
+            self._set_base(base)
+        else:
+            self.logger = setup_basic_logger(custom_dir, log_level, f"hyperparameters_{id}")
+        if blueprint is None:
+            if base is None:
+                self.logger.error(msg := f"Hyperparameters '{id}' needs a BluePrint or a base to take it from")
+                raise TypeError(msg)
+            blueprint = base.blueprint
         if HyperParameters.dirPath is None:
-            HyperParameters.dirPath = Path.cwd() / "HyperParameters" if custom_dir is None else custom_dir
+            HyperParameters.dirPath = HyperParameters.directory(custom_dir)
             HyperParameters.dirPath.mkdir(parents=True, exist_ok=True) # Create directory if it doesn't exist
             self.logger.info(f"HyperParameters directory at: {HyperParameters.dirPath}")
+        self.blueprint = blueprint # if isinstance(blueprint, BluePrint) else BluePrint(id=blueprint).load(dirPath=dirPath.parent / "Blueprints")
         if load_existing:
             load_dir = HyperParameters.dirPath if custom_dir is None else custom_dir
             self.load(load_dir)
             self.logger.info(f"Loaded existing Hyperparameters combination at: {load_dir}")
-        self.blueprint = blueprint # if isinstance(blueprint, BluePrint) else BluePrint(id=blueprint).load(dirPath=dirPath.parent / "Blueprints")
 
         for k,v in kwargs.items():
             if k not in self.blueprint:
@@ -36,42 +107,314 @@ class HyperParameters(object):
             else:
                 self.logger.warning(f"Keyword '{k}' did not pass BluePrint '{blueprint.id}' constraints. Value: {v}")
 
-    def save(self, custom_dir=None):
+    def save(self, custom_dir=None, force=False, changelog=False, fsync=False, delta=False):
+        """
+        Saves values to 'HyperParameters_{id}.json', skipping the write if nothing changed since the last save or load.
+        The file is replaced atomically (written to a temporary file that is then renamed), so it is never left truncated.
+        Changes are tracked through __setitem__, values assigned as attributes directly are not.
+        Input:
+            custom_dir (path-like): Directory to save to, defaults to HyperParameters.dirPath
+            force (bool): Write even if nothing changed
+            changelog (bool): Only append the changed values to 'HyperParameters_{id}.changes.jsonl' (replayed by load),
+                instead of rewriting the whole file. A save without changelog compacts the log into the file.
+                Every full save starts a new generation of the file, changes logged for another generation are ignored by load.
+                Overlays saved without delta are always written in full, as the changes of their base are not tracked
+            fsync (bool): Flush the file to disk before returning
+            delta (bool): For overlays (see base), only save the values set on this instance and the id of the base,
+                which is saved to the same directory (if it changed). Load resolves the base again
+        """
+        start = time.perf_counter()
         file_path = Path(HyperParameters.dirPath if custom_dir is None else custom_dir) / f"HyperParameters_{self.id}.json"
-        with open(file_path, "w") as f:
-             json.dump(self, f, cls=HyperParametersEncoder)
+        if delta and self._base is not None:
+            self._base.save(custom_dir, fsync=fsync)
+        up_to_date = file_path == self._saved_path and file_path.exists()
+        if up_to_date and not force and not self._dirty and (self._base is None or delta): # Full saves of overlays include base changes
+            return
+        if delta and self._base is not None:
+            template = HyperParametersEncoder.template(self.id, vars(self).items())
+            template["__base__"] = self._base.id
+        else:
+            template = HyperParametersEncoder().default(self)
+        changelog_path = self._changelog_path(file_path)
+        if up_to_date and changelog and (self._base is None or delta): # Only own changes are tracked, not those of the base
+            changes = {section: [(k, v) for k, v in template[section] if k in self._dirty] for section in ["__classes__", "__primitives__"]}
+            changes["__generation__"] = self._generation
+            data = (json.dumps(changes) + "\n").encode()
+            with open(changelog_path, "ab") as f:
+                f.write(data)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+        else:
+            template["__generation__"] = generation = uuid.uuid4().hex # A change log left behind by a crash no longer applies
+            data = json.dumps(template).encode()
+            atomic_write(file_path, data, fsync)
+            self._generation = generation
+            changelog_path.unlink(missing_ok=True) # Compacted into the file
+        self._saved_path = file_path
+        self._dirty.clear()
+        if Stats.enabled: Stats.record("hyperparameters.save", time.perf_counter() - start, len(data))
 
-    def load(self, custom_dir=None):
+    def load(self, custom_dir=None, lazy=False):
+        """
+        Loads values from 'HyperParameters_{id}.json', replaying any changes appended by save(changelog=True).
+        With lazy=True classes are only imported when first used (see Utils.LazyClass).
+        Files saved with delta=True get their base from the same directory (loaded once and shared by every overlay),
+        unless this instance already has a base with that id.
+        """
         file_path = Path(HyperParameters.dirPath if custom_dir is None else custom_dir) / f"HyperParameters_{self.id}.json"
         if not file_path.exists() and file_path.is_file(): 
             self.logger.error(msg := f"{file_path} does not exist so it could not be loaded into Hyperparameters '{self.id}'.")
             raise FileNotFoundError(msg)
+        kwargs, self._generation = self._read(file_path, lazy)
+        base_id = kwargs.pop("__base__", None)
+        if base_id is not None and (self._base is None or self._base.id != base_id):
+            self._set_base(self._load_base(file_path.parent, base_id, lazy))
+        self._apply(kwargs)
+        self._saved_path = file_path
+        self._dirty.clear()
+        return self
+
+    @classmethod
+    def _read(cls, file_path, lazy=False):
+        """
+        Decoded values of a saved HyperParameters file with its change log replayed, without applying them.
+        Output:
+            Tuple of (values, generation of the file)
+        """
+        start = time.perf_counter()
         with open(file_path, "r") as f:
-            kwargs = json.load(f, cls=HyperParametersDecoder)
+            template = json.load(f)
+            nbytes = f.tell()
+        decoder = HyperParametersDecoder(lazy=lazy)
+        kwargs, generation = decoder.object_hook(template), template.get("__generation__") # None for files saved without one
+        changelog_path = cls._changelog_path(file_path)
+        if changelog_path.exists():
+            with open(changelog_path, "r") as f:
+                for line in f:
+                    if not line.endswith("\n"): continue # Ignore a change that was still being written
+                    change = json.loads(line)
+                    if change.get("__generation__") == generation: # Logged for an older version of the file otherwise
+                        kwargs.update(decoder.object_hook(change))
+                nbytes += f.tell()
+        if Stats.enabled: Stats.record("hyperparameters.load", time.perf_counter() - start, nbytes)
+        return kwargs, generation
+
+    async def asave(self, custom_dir=None, force=False, changelog=False, fsync=False, delta=False):
+        """
+        Coroutine version of save, the file is written in a worker thread so the event loop is not blocked.
+        Values should not be changed until it completes.
+        """
+        return await asyncio.to_thread(self.save, custom_dir, force, changelog, fsync, delta)
+
+    async def aload(self, custom_dir=None, lazy=False):
+        """
+        Coroutine version of load, the file is read in a worker thread so the event loop is not blocked.
+        Values should not be accessed until it completes.
+        """
+        return await asyncio.to_thread(self.load, custom_dir, lazy)
+
+    def _load_base(self, dir_path, id, lazy):
+        base_path = dir_path / f"HyperParameters_{id}.json"
+        key = (str(base_path), base_path.stat().st_mtime_ns, lazy)
+        with HyperParameters._loaded_bases_lock: # Overlays sharing a base may be loaded from several threads, see load_all
+            base = HyperParameters._loaded_bases.get(key)
+            if base is None:
+                base = HyperParameters._loaded_bases[key] = HyperParameters(id, self.blueprint).load(dir_path, lazy)
+        return base
+
+    def _set_base(self, base):
+        self._base = base
+        if base._overlays is None:
+            base._overlays = weakref.WeakValueDictionary()
+        base._overlays[id(self)] = self
+        self._invalidate()
+
+    def _params(self):
+        """Attributes of this instance, falling back to those of its base."""
+        return vars(self) if self._base is None else ChainMap(vars(self), self._base._params())
+
+    @staticmethod
+    def _changelog_path(file_path):
+        return file_path.with_suffix(".changes.jsonl")
+
+    @classmethod
+    def save_many(cls, hparams, path):
+        """
+        Writes many HyperParameters to a single JSON Lines file, one object per line in the 'HyperParameters_{id}.json' format.
+        Input:
+            hparams (iterable): HyperParameters to save, consumed lazily
+            path (path-like): JSON Lines file, overwritten if it exists
+        Output:
+            Number of HyperParameters written
+        """
+        count = 0
+        with open(path, "w") as f:
+            for h in hparams:
+                f.write(json.dumps(h, cls=HyperParametersEncoder) + "\n")
+                count += 1
+        return count
+
+    @classmethod
+    def load_many(cls, path, blueprint, lazy=False):
+        """Lazily loads every HyperParameters in a JSON Lines file written by save_many (see load for 'lazy')."""
+        decoder = HyperParametersDecoder(lazy=lazy)
+        with open(path, "r") as f:
+            for line in f:
+                if not line.strip(): continue
+                dct = json.loads(line)
+                yield cls(dct["id"], blueprint)._apply(decoder.object_hook(dct))
+
+    @staticmethod
+    def directory(custom_dir=None):
+        """
+        Directory of HyperParameters files: 'custom_dir' if given, else HyperParameters.dirPath, else the 'HyperParameters'
+        folder of the working directory, where the first instance will set dirPath to (so it also works before any instance exists).
+        """
+        if custom_dir is not None:
+            return Path(custom_dir)
+        return Path.cwd() / "HyperParameters" if HyperParameters.dirPath is None else Path(HyperParameters.dirPath)
+
+    @classmethod
+    def saved_ids(cls, custom_dir=None):
+        """Ids of every 'HyperParameters_{id}.json' in 'custom_dir'."""
+        dir_path = HyperParameters.directory(custom_dir)
+        return [file_path.stem[len("HyperParameters_"):] for file_path in sorted(dir_path.glob("HyperParameters_*.json"))]
+
+    @classmethod
+    def save_all(cls, hparams, custom_dir=None, max_workers=None, max_in_flight=None):
+        """
+        Saves many HyperParameters to the one-file-per-id layout, writing files from a thread pool.
+        'hparams' is consumed as files are written, at most 'max_in_flight' (defaults to twice the workers) ahead.
+        """
+        for _ in _bounded_map(lambda h: h.save(custom_dir), hparams, max_workers, max_in_flight): pass
+
+    @classmethod
+    def load_all(cls, blueprint, ids=None, custom_dir=None, max_workers=None, lazy=False, max_in_flight=None):
+        """
+        Loads many HyperParameters from the one-file-per-id layout, reading files from a thread pool.
+        Input:
+            blueprint (BluePrint): BluePrint of the loaded HyperParameters
+            ids (iterable): Ids to load, defaults to every saved id in 'custom_dir'
+            custom_dir (path-like): Directory to load from, defaults to HyperParameters.directory()
+            max_in_flight (int): Maximum number of files read ahead of the consumer, defaults to twice the workers
+        Output:
+            Generator of HyperParameters, in the same order as 'ids'
+        """
+        ids = cls.saved_ids(custom_dir) if ids is None else ids
+        yield from _bounded_map(lambda id: cls(id, blueprint).load(custom_dir, lazy), ids, max_workers, max_in_flight)
+
+    def _apply(self, kwargs):
+        """Updates hyper-parameters with previously validated (e.g. saved) values, bypassing BluePrint checks."""
         vars(self).update(kwargs)
+        self._invalidate()
+        self._dirty.update(kwargs)
         return self
 
     def fetch_class_hyperparameters(self, cls):
+        cls = resolve_class(cls)
         if not inspect.isclass(cls):
             self.logger.error(msg := f"Attempted to fetch hyper-parameters for non-class: {cls}")
             raise TypeError(msg)
-        kwargs = {}
-        sig = inspect.signature(cls)
-        for param in sig.parameters.values():
-            if param.default not in [inspect.Parameter.empty, inspect._empty]:
-                # Use existing hyper-parameter as default argument, otherwise use existing default argument
-                kwargs.update({param.name: vars(self).get(param.name, param.default)})
-        return kwargs
+        if Stats.enabled: Stats.count("hyperparameters.fetch_class_hyperparameters")
+        kwargs = self._bound_kwargs.get(cls)
+        if kwargs is None:
+            if Stats.enabled: Stats.count("hyperparameters.fetch_class_hyperparameters.misses")
+            # Use existing hyper-parameter as default argument, otherwise use existing default argument
+            params = self._params()
+            kwargs = self._bound_kwargs[cls] = {name: params.get(name, default) for name, default in class_binder(cls)}
+        return dict(kwargs) # Copy, so callers can modify kwargs without corrupting the cache
+
+    def _changed(self, key):
+        """Marks 'key' for the next save and drops bound kwargs of any class whose signature depends on it."""
+        self._dirty.add(key)
+        self._invalidate(key)
+
+    def _invalidate(self, key=None):
+        """Drops bound kwargs and factories that depend on 'key' (all of them if None), here and in overlays that inherit it."""
+        self._factories.clear() # Factories may depend on 'key' through nested classes
+        if key is None:
+            self._bound_kwargs.clear()
+        else:
+            for cls in [cls for cls in self._bound_kwargs if any(name == key for name, _ in class_binder(cls))]:
+                del self._bound_kwargs[cls]
+        for overlay in list((self._overlays or {}).values()):
+            if key is None or key not in vars(overlay):
+                overlay._invalidate(key)
+
+    def factory(self, key):
+        """
+        Precompiled constructor for the class held by hyper-parameter 'key', cached until any hyper-parameter changes.
+        Keyword arguments of the class that are also hyper-parameters are bound to their values, so positional arguments
+        can still be passed at call time. Those bound to a hyper-parameter that is itself a class
+        (e.g. an optimizer's 'scheduler') are replaced by that class's factory, so nested classes can be constructed with
+        arguments only known at call time.
+        Example Use:
+            make_optimizer = hparams.factory("optimizer")
+            for fold in folds: optimizer = make_optimizer(model.parameters())
+        Input:
+            key (str): Hyper-parameter holding a class
+        Output:
+            functools.partial of the class with its bound keyword arguments
+        """
+        factory = self._factories.get(key)
+        if factory is None:
+            factory = self._factories[key] = self._build_factory(key, [])
+        return factory
+
+    def _build_factory(self, key, building):
+        if key in building:
+            self.logger.error(msg := f"Classes of hyper-parameters {building + [key]} depend on each other, they can not be constructed")
+            raise ValueError(msg)
+        cls = resolve_class(self._params().get(key))
+        if not inspect.isclass(cls):
+            self.logger.error(msg := f"Hyper-parameter '{key}' of Hyperparameters '{self.id}' is not a class: {cls}")
+            raise (TypeError if key in self else KeyError)(msg)
+        params = self.to_dict()
+        kwargs = {name: params[name] for name, _ in class_binder(cls) if name in params} # Defaults are left to the class
+        for name, value in kwargs.items():
+            if name != key and (inspect.isclass(value) or isinstance(value, LazyClass)):
+                if name not in self._factories:
+                    self._factories[name] = self._build_factory(name, building + [key])
+                kwargs[name] = self._factories[name]
+        if Stats.enabled: Stats.count("hyperparameters.factory.builds")
+        return partial(cls, **kwargs)
+
+    def instantiate(self, key, *args, **kwargs):
+        """Constructs the class held by hyper-parameter 'key', see factory. Arguments are passed on, keyword arguments override bound ones."""
+        return self.factory(key)(*args, **kwargs)
+
+    def to_dict(self):
+        """Hyper-parameter values of this instance, without the id, blueprint, logger and internal attributes."""
+        return {k: v for k, v in self._params().items() if k not in ["id", "blueprint", "logger"] and not k.startswith("_")}
+
+    def fingerprint(self, keys=None):
+        """Stable content hash of the values this instance would save, classes are identified by qualified name (see fingerprint)."""
+        return fingerprint(HyperParametersEncoder().default(self), keys)
+
+    def freeze(self):
+        """Immutable, hashable snapshot of the current hyper-parameter values, see FrozenHyperParameters."""
+        return FrozenHyperParameters(self.id, self.blueprint.id, self.to_dict().items())
 
     def wizard(self):
         for key, constraint in vars(self.blueprint).items():
-            if key in ["id", "skip_prompts", "logger"]: continue
+            if key in ["id", "skip_prompts", "logger"] or key.startswith("_"): continue
             is_typed = True if type(constraint) is type else False
+            is_range = isinstance(constraint, Range)
             if is_typed: print(f"Enter value of Type {constraint.__name__}")
+            elif is_range: print(f"Enter value in {constraint}")
             else: print("\n".join([f"{i}: {c}" for i, c in enumerate(constraint)]))
 
             while (resp := input(f"Choose a value for {key}, or ENTER to skip").strip()) != "":
-                if is_typed:
+                if is_range:
+                    try:
+                        value = int(resp) if constraint.integer else float(resp)
+                    except ValueError:
+                        value = None
+                    if value in constraint:
+                        break
+                    print(f"Response {resp} did not satisfy {key}'s {constraint} constraint")
+                elif is_typed:
                     try:
                         value = constraint(resp)
                         break
@@ -85,18 +428,20 @@ class HyperParameters(object):
                         print(f"Please select a one of the options for {key} by number.")
             if resp != "":
                 vars(self).update({key:value})
+                self._changed(key)
    
     def get(self, key, default=None):
-        item = vars(self).get(key, default) 
+        item = resolve_class(self._params().get(key, default)) # Classes loaded with lazy=True are imported on first access
          # If hyper-parameter shows up as option for class, use it instead of default
         return (item, self.fetch_class_hyperparameters(item)) if inspect.isclass(item) else item
 
     def __getitem__(self, key):
         try:
-            item = vars(self).get(key)
+            item = self._params().get(key)
         except:
             self.logger.error(msg := f"'{key}' not in Hyperparameters '{self.id}'")
             raise KeyError(msg)
+        item = resolve_class(item) # Classes loaded with lazy=True are imported on first access
          # If hyper-parameter shows up as option for class, use it instead of default
         return (item, self.fetch_class_hyperparameters(item)) if inspect.isclass(item) else item
 
@@ -114,19 +459,23 @@ class HyperParameters(object):
                 raise ValueError(msg)
         else: # Hyperparameter only exists in this instance
             vars(self).update({key:value})
+        self._changed(key)
+
+    def __contains__(self, item):
+        return True if item in self._params() else False
 
     def __eq__(self, other):
-        x, y = vars(self), vars(other)
+        x, y = self._params(), other._params()
         for k in {**x, **y}.keys():
-            if k == "id": continue
+            if k in ["id", "logger"] or k.startswith("_"): continue # Loggers are named after the id (or shared with a base)
             if k not in x or k not in y: return False
-            if x[k] != y[k]: return False
+            if x[k] != y[k] and resolve_class(x[k]) != resolve_class(y[k]): return False
         return True
 
     def __str__(self):
         info_str = f">>> {C.BOLD} Hyper-Parameters '{self.id}' {C.END} <<<"
-        for key,value in vars(self).items():
-            if key in [*inspect.signature(self.__init__).parameters.keys(), "logger"]: continue # Ignore __init__ signature params
+        for key,value in self._params().items():
+            if key in [*inspect.signature(self.__init__).parameters.keys(), "logger"] or key.startswith("_"): continue # Ignore __init__ signature params
             if type(value) == tuple:
                 info_str += "\n{C.BOLD}{key}{C.END} = {value}"
                 if len(value) == 2:
@@ -135,35 +484,105 @@ class HyperParameters(object):
                 info_str += f"\n{key} = {value}"
         return info_str
 
+class FrozenHyperParameters(object):
+    """
+    Compact, immutable snapshot of HyperParameters, for deduplication and joins over many configurations.
+    Values are kept in two tuples sorted by key and the hash is computed once, so equality and hashing are cheap.
+    Like HyperParameters, equality ignores the id. All values must be hashable.
+    """
+    __slots__ = ("id", "blueprint_id", "keys", "values", "_hash")
+
+    def __init__(self, id, blueprint_id, items):
+        items = sorted(items)
+        keys, values = tuple(k for k, _ in items), tuple(v for _, v in items)
+        for name, value in zip(self.__slots__, (id, blueprint_id, keys, values, hash((keys, values)))):
+            object.__setattr__(self, name, value)
+
+    def thaw(self, blueprint, log_level=logging.INFO):
+        """Mutable HyperParameters with the values of this snapshot."""
+        return HyperParameters(self.id, blueprint, log_level=log_level)._apply(self.to_dict())
+
+    def to_dict(self):
+        return dict(zip(self.keys, self.values))
+
+    def items(self):
+        return zip(self.keys, self.values)
+
+    def get(self, key, default=None):
+        i = bisect_left(self.keys, key)
+        return self.values[i] if i < len(self.keys) and self.keys[i] == key else default
+
+    def __getitem__(self, key):
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            raise KeyError(f"'{key}' not in Hyperparameters '{self.id}'")
+        return self.values[i]
+
+    def __contains__(self, key):
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenHyperParameters '{self.id}' is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"FrozenHyperParameters '{self.id}' is immutable")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenHyperParameters):
+            return NotImplemented
+        return self._hash == other._hash and self.keys == other.keys and self.values == other.values
+
+    def __reduce__(self):
+        return (FrozenHyperParameters, (self.id, self.blueprint_id, tuple(self.items())))
+
+    def __repr__(self):
+        return f"FrozenHyperParameters('{self.id}', {self.to_dict()})"
+
 class HyperParametersEncoder(json.JSONEncoder):
 
     def default(self, obj):
         if isinstance(obj, HyperParameters):
-            template = {"id": "default", "__classes__":[],
-                        "__primitives__":[]}
-            for k, v in vars(obj).items():
-                if k == "logger": continue
-                if k == "id":
-                    template["id"] = v
-                elif callable(v):
-                    template["__classes__"].append((k,f"{v.__module__}.{v.__name__}"))
-                elif type(v) in [str, int, bool, float]:
-                    template["__primitives__"].append((k,v))
-            return template
+            return self.template(obj.id, obj._params().items())
         return json.JSONEncoder.default(self, obj)
 
+    @staticmethod
+    def template(id, items):
+        """Saved format of the (key, value) pairs in 'items', only classes and primitives are saved."""
+        template = {"id": id, "__classes__":[],
+                    "__primitives__":[]}
+        for k, v in items:
+            if k in ["id", "logger"] or k.startswith("_"): continue
+            elif callable(v):
+                template["__classes__"].append((k,qualified_name(v)))
+            elif type(v) in [str, int, bool, float]:
+                template["__primitives__"].append((k,v))
+        return template
+
 class HyperParametersDecoder(json.JSONDecoder):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, lazy=False, **kwargs):
+        self.lazy = lazy # Decode classes as Utils.LazyClass, which are only imported when first used
         json.JSONDecoder.__init__(self, object_hook=self.object_hook, *args, **kwargs)
         
     def object_hook(self, dct):
         if "__classes__" in dct and "__primitives__" in dct: # Is Hyperparameters instance
             kwargs = {}
             for k, v in dct["__classes__"]:
-                kwargs[k] = class_from_string(v)
+                kwargs[k] = class_from_string(v, lazy=self.lazy)
             for k, v in dct["__primitives__"]:
                 kwargs[k] = v
+            if "__base__" in dct: # Saved with delta=True, resolved by HyperParameters.load
+                kwargs["__base__"] = dct["__base__"]
             return kwargs
         return dct
 
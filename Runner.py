@@ -0,0 +1,191 @@
+import os, sys, json, asyncio, logging
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+
+TrialResult = namedtuple("TrialResult", ["id", "result", "error"])
+TrialResult.__doc__ = "Outcome of a trial, 'error' is None if the trial succeeded, otherwise a description of the failure."
+
+_blueprints = {} # BluePrint id -> BluePrint rebuilt in this (worker) process
+
+def to_payload(hparams):
+    """
+    Minimal, picklable representation of a HyperParameters instance (no logger, no BluePrint instance).
+    Output:
+        Tuple of (id, blueprint id, blueprint constraints, hyper-parameter values)
+    """
+    return (hparams.id, hparams.blueprint.id, hparams.blueprint.constraints(), hparams.to_dict())
+
+def from_payload(payload, log_level=logging.WARNING):
+    """Rebuilds HyperParameters from 'to_payload', BluePrints are only rebuilt once per process."""
+    id, blueprint_id, constraints, values = payload
+    blueprint = _blueprints.get(blueprint_id)
+    if blueprint is None or blueprint.constraints() != constraints:
+        blueprint = _blueprints[blueprint_id] = BluePrint(blueprint_id, skip_prompts=True, log_level=log_level)
+        vars(blueprint).update(constraints) # Already validated when the original BluePrint was built
+    hparams = HyperParameters(id, blueprint, log_level=log_level)
+    vars(hparams).update(values) # Already validated against the BluePrint by the sender
+    return hparams
+
+def _run_trial(trial_fn, payload):
+    return trial_fn(from_payload(payload))
+
+def _record(result, fingerprint, index, results_file):
+    """Adds the fingerprint of a successful trial to 'index' and appends 'result' to 'results_file', if given."""
+    if fingerprint is not None and result.error is None:
+        index.add(fingerprint, result.id)
+    if results_file is not None:
+        results_file.write(json.dumps(result._asdict(), default=repr) + "\n")
+        results_file.flush()
+
+def run_trials(trial_fn, configs, max_workers=None, max_in_flight=None, max_retries=1, results_path=None, index=None):
+    """
+    Runs 'trial_fn' on every HyperParameters in 'configs' across a pool of worker processes.
+    Configs are consumed lazily and at most 'max_in_flight' trials are submitted at any time.
+    If a worker process dies, the pool is restarted and the trials that were in flight are rerun one at a time,
+    so only the trial that crashed the worker is charged a retry.
+    Input:
+        trial_fn (callable): Picklable (i.e. module-level) function taking HyperParameters
+        configs (iterable): HyperParameters to run, e.g. Sweep.grid_search(blueprint)
+        max_workers (int): Number of worker processes, defaults to the number of CPUs
+        max_in_flight (int): Maximum number of submitted but unfinished trials, defaults to twice max_workers
+        max_retries (int): Times a trial is rerun after crashing a worker before it is reported as failed
+        results_path (path-like): Optional JSON Lines file each TrialResult is appended to
+        index (Store.FingerprintIndex): Optional index of configurations that already ran, these (and copies of a configuration
+            that is still running) are skipped, nothing is yielded for them. Fingerprints of successful trials are added to it
+    Output:
+        Generator of TrialResult, in order of completion
+    """
+    max_workers = max_workers or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * max_workers
+    configs, suspects = iter(configs), deque() # Trials lost in a crash, rerun one at a time to find the culprit
+    crashes, pending, fingerprints = {}, {}, {} # Fingerprint -> id of the configurations in flight
+    results_file = None if results_path is None else open(results_path, "a")
+    pool = ProcessPoolExecutor(max_workers)
+    try:
+        while True:
+            broken = False
+            try:
+                if suspects and not pending:
+                    payload, fingerprint = suspects.popleft()
+                    pending[pool.submit(_run_trial, trial_fn, payload)] = (payload, fingerprint, True)
+                while not suspects and len(pending) < max_in_flight:
+                    hparams = next(configs, None)
+                    if hparams is None: break
+                    fingerprint = None
+                    if index is not None:
+                        fingerprint = hparams.fingerprint()
+                        if fingerprint in fingerprints or fingerprint in index: continue
+                        fingerprints[fingerprint] = hparams.id
+                    payload = to_payload(hparams)
+                    pending[pool.submit(_run_trial, trial_fn, payload)] = (payload, fingerprint, False)
+            except BrokenProcessPool: # Pool broke before the failure of a pending trial was noticed
+                broken = True
+                suspects.appendleft((payload, fingerprint))
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            elif broken:
+                done = set()
+            else:
+                break
+            for future in done:
+                payload, fingerprint, isolated = pending.pop(future)
+                id = payload[0]
+                try:
+                    result = TrialResult(id, future.result(), None)
+                except BrokenProcessPool:
+                    broken = True
+                    if isolated: # Trial ran on its own, so it caused the crash
+                        crashes[id] = crashes.get(id, 0) + 1
+                        if crashes[id] > max_retries:
+                            result = TrialResult(id, None, f"Worker crashed {crashes[id]} times while running trial")
+                        else:
+                            suspects.append((payload, fingerprint))
+                            continue
+                    else:
+                        suspects.append((payload, fingerprint))
+                        continue
+                except Exception as e:
+                    result = TrialResult(id, None, repr(e))
+                if fingerprint is not None:
+                    del fingerprints[fingerprint]
+                _record(result, fingerprint, index, results_file)
+                yield result
+            if broken: # Futures still pending fail with BrokenProcessPool too, and become suspects on the next pass
+                pool.shutdown(wait=True, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if results_file is not None:
+            results_file.close()
+
+async def arun_trials(trial_fn, configs, max_concurrency=None, results_path=None, index=None):
+    """
+    Asyncio counterpart of run_trials, for event-loop based controllers, e.g. ones that launch each trial as a subprocess.
+    Configs are consumed lazily and at most 'max_concurrency' trials run at any time, without blocking the event loop:
+    iterating (synchronous) configs, the index and the results file are all handled in worker threads.
+    Example Use:
+        async def trial(hparams):
+            proc = await asyncio.create_subprocess_exec(sys.executable, "train.py", "--id", hparams.id)
+            return await proc.wait()
+        async for result in arun_trials(trial, Sweep.grid_search(bp), max_concurrency=4): ...
+    Input:
+        trial_fn (callable): Coroutine function taking HyperParameters, or a regular function which is then run in a worker thread
+        configs (iterable or async iterable): HyperParameters to run
+        max_concurrency (int): Maximum number of trials running at once, defaults to the number of CPUs
+        results_path, index: See run_trials
+    Output:
+        Async generator of TrialResult, in order of completion
+    """
+    max_concurrency = max_concurrency or os.cpu_count()
+    run = trial_fn if asyncio.iscoroutinefunction(trial_fn) else lambda hparams: asyncio.to_thread(trial_fn, hparams)
+    if hasattr(configs, "__aiter__"):
+        configs = configs.__aiter__()
+        next_config = lambda: anext(configs, None)
+    else:
+        configs = iter(configs)
+        next_config = lambda: asyncio.to_thread(next, configs, None)
+    pending, fingerprints, exhausted = {}, {}, False # Fingerprint -> id of the configurations in flight
+    results_file = None if results_path is None else await asyncio.to_thread(open, results_path, "a")
+    try:
+        while True:
+            while not exhausted and len(pending) < max_concurrency:
+                hparams = await next_config()
+                if hparams is None:
+                    exhausted = True
+                    break
+                fingerprint = None
+                if index is not None:
+                    fingerprint = hparams.fingerprint()
+                    if fingerprint in fingerprints or await asyncio.to_thread(index.__contains__, fingerprint): continue
+                    fingerprints[fingerprint] = hparams.id
+                pending[asyncio.ensure_future(run(hparams))] = (hparams.id, fingerprint)
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                id, fingerprint = pending.pop(task)
+                try:
+                    result = TrialResult(id, task.result(), None)
+                except Exception as e:
+                    result = TrialResult(id, None, repr(e))
+                if fingerprint is not None:
+                    del fingerprints[fingerprint]
+                if fingerprint is not None or results_file is not None:
+                    await asyncio.to_thread(_record, result, fingerprint, index, results_file)
+                yield result
+    finally:
+        for task in pending: # Generator closed early or cancelled
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        if results_file is not None:
+            await asyncio.to_thread(results_file.close)
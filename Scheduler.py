@@ -0,0 +1,102 @@
+import sys, math, json, logging
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from HyperParameters import HyperParameters
+from Sweep import random_search
+from Utils import atomic_write
+
+class SuccessiveHalving(object):
+    """
+    Early-stopping scheduler over the search space of a BluePrint.
+    Samples 'n' configurations (see Sweep.random_search) and runs them all at 'min_budget'. The best 1/eta of
+    each rung are promoted to a rung with eta times the budget, until 'max_budget' is reached.
+    Example Use:
+        def trial(hparams, budget): # E.g. train for 'budget' epochs (resuming from a checkpoint), return validation loss
+            ...
+        best, score = SuccessiveHalving(bp, trial, n=27, min_budget=1, max_budget=9).run()[0]
+    blueprint (BluePrint): Constraints to sample configurations from
+    trial_fn (callable): trial_fn(hparams, budget) returns the metric of 'hparams' after using 'budget'.
+        A promoted configuration is reported on again with a larger budget. Budgets and metrics are kept by the scheduler
+        (see records), the HyperParameters themselves are not changed.
+    n (int): Number of configurations in the first rung
+    min_budget, max_budget (int or float): Budget of the first and last rung
+    eta (int): Fraction (1/eta) of each rung that is promoted, and factor the budget grows by
+    mode (str): 'min' if lower metrics are better, 'max' otherwise
+    seed (int): Seed of the sampled configurations
+    custom_dir (path-like): Each rung's HyperParameters are saved to custom_dir / 'rung_{i}', along with the budget and score
+        of each of them in 'scores.json'. Defaults to HyperParameters.directory()
+    **fixed: Values for hyper-parameters that are not sampled, see Sweep.random_search
+    """
+
+    def __init__(self, blueprint, trial_fn, n, min_budget=1, max_budget=None, eta=3, mode="min", seed=0,
+                 custom_dir=None, id_prefix="sh_", log_level=logging.INFO, **fixed):
+        if mode not in ["min", "max"]:
+            raise ValueError(f"Mode must be 'min' or 'max', got '{mode}'")
+        if eta < 2:
+            raise ValueError(f"Eta must be at least 2, got {eta}")
+        self.blueprint, self.trial_fn = blueprint, trial_fn
+        self.n, self.eta, self.mode, self.seed = n, eta, mode, seed
+        self.min_budget = min_budget
+        self.max_budget = min_budget * eta ** max(math.floor(math.log(n, eta)), 0) if max_budget is None else max_budget
+        self.custom_dir, self.id_prefix, self.log_level, self.fixed = custom_dir, id_prefix, log_level, fixed
+        self.rungs = [] # List of rungs, each a list of (HyperParameters, score) sorted best first
+        self.records = {} # HyperParameters id -> {budget: score} of every rung it ran in
+
+    def budgets(self):
+        """Budget of every rung, growing by a factor of eta from min_budget and ending at max_budget."""
+        rungs = math.floor(math.log(self.max_budget / self.min_budget, self.eta) + 1e-9) # Tolerate rounding, e.g. 10 / 9 * 9
+        return [self.min_budget * self.eta ** i for i in range(rungs)] + [self.max_budget]
+
+    def run(self):
+        """
+        Runs every rung.
+        Output:
+            (HyperParameters, score) pairs of the last rung, best first
+        """
+        configs = list(random_search(self.blueprint, self.n, self.seed, self.id_prefix, log_level=self.log_level, **self.fixed))
+        for i, budget in enumerate(self.budgets()):
+            rung = self.run_rung(i, budget, configs)
+            configs = [hparams for hparams, _ in rung[:max(1, len(rung) // self.eta)]]
+            if len(rung) == 1:
+                break
+        return self.rungs[-1]
+
+    def run_rung(self, i, budget, configs):
+        rung_dir = HyperParameters.directory(self.custom_dir) / f"rung_{i}"
+        rung_dir.mkdir(parents=True, exist_ok=True)
+        rung = []
+        for hparams in configs:
+            score = self.trial_fn(hparams, budget)
+            self.records.setdefault(hparams.id, {})[budget] = score
+            hparams.save(rung_dir)
+            rung.append((hparams, score))
+        rung.sort(key=lambda pair: pair[1], reverse=self.mode == "max")
+        scores = [{"id": hparams.id, "budget": budget, "score": score} for hparams, score in rung]
+        atomic_write(rung_dir / "scores.json", json.dumps(scores, indent=1, default=repr).encode())
+        self.rungs.append(rung)
+        return rung
+
+def hyperband(blueprint, trial_fn, min_budget, max_budget, eta=3, mode="min", seed=0, custom_dir=None, log_level=logging.INFO, **fixed):
+    """
+    Hyperband: runs SuccessiveHalving brackets that trade off the number of configurations against their starting budget.
+    Bracket s samples about (s_max + 1) / (s + 1) * eta^s configurations starting at max_budget / eta^s,
+    and is saved to custom_dir / 'bracket_{s}'. Arguments are as for SuccessiveHalving.
+    Output:
+        (HyperParameters, score) of the best configuration over all brackets, and the list of SuccessiveHalving brackets
+    """
+    s_max = math.floor(math.log(max_budget / min_budget, eta) + 1e-9)
+    root = HyperParameters.directory(custom_dir)
+    brackets, best = [], None
+    for s in reversed(range(s_max + 1)):
+        n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        bracket = SuccessiveHalving(blueprint, trial_fn, n, max_budget / eta ** s, max_budget, eta, mode, seed + s,
+                                    root / f"bracket_{s}", f"hb{s}_", log_level, **fixed)
+        top = bracket.run()[0]
+        if best is None or (top[1] < best[1] if mode == "min" else top[1] > best[1]):
+            best = top
+        brackets.append(bracket)
+    return best, brackets
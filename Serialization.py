@@ -0,0 +1,244 @@
+import sys, json, struct, marshal
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from BluePrint import BluePrint, BluePrintEncoder, BluePrintDecoder
+from HyperParameters import HyperParameters, HyperParametersEncoder, HyperParametersDecoder
+from Utils import atomic_write
+"""
+Pluggable serializers for BluePrints and HyperParameters.
+Objects are first converted to templates (the dictionaries written by BluePrintEncoder / HyperParametersEncoder),
+which a Serializer turns into bytes. Every serialized object or stream carries the schema version it was written with.
+    'json': Same format as 'BluePrint_{id}.json' / 'HyperParameters_{id}.json', streams are JSON Lines after a header line
+    'binary': Length-prefixed marshal records after a binary header, faster to write and read than JSON
+        (see benchmarks/bench_hot_paths.py)
+Example Use:
+    Serialization.dump_many([bp, *Sweep.grid_search(bp)], "sweep.bin", format="binary")
+    for hparams in Serialization.load_many("sweep.bin"): launch(hparams)
+"""
+SCHEMA_VERSION = 1
+
+class Serializer(ABC):
+    """
+    Converts templates to bytes and back. Subclass and register() it to add a format.
+    Data that can not be decoded (e.g. truncated) must raise ValueError.
+    name (str): Name used to select the format
+    magic (bytes): Leading bytes of everything this serializer writes, used to detect the format when loading.
+        None for the default (JSON) format
+    """
+    name, magic = None, None
+
+    @abstractmethod
+    def dumps(self, template):
+        """Bytes of a single template."""
+
+    @abstractmethod
+    def loads(self, data):
+        """Template of bytes written by dumps."""
+
+    @abstractmethod
+    def dump_stream(self, templates, f):
+        """Writes every template in the iterable 'templates' to the binary file 'f', returns the number written."""
+
+    @abstractmethod
+    def load_stream(self, f):
+        """Lazily yields every template written to the binary file 'f' by dump_stream."""
+
+def _check_version(version):
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Data was written with schema version {version}, only up to {SCHEMA_VERSION} is supported")
+
+class JSONSerializer(Serializer):
+    name = "json"
+
+    def dumps(self, template):
+        return json.dumps({**template, "__version__": SCHEMA_VERSION}).encode()
+
+    def loads(self, data):
+        template = json.loads(data)
+        _check_version(template.get("__version__", 1)) # Files saved by BluePrint.save / HyperParameters.save have none
+        return template
+
+    def dump_stream(self, templates, f):
+        f.write((json.dumps({"__header__": self.name, "__version__": SCHEMA_VERSION}) + "\n").encode())
+        count = 0
+        for template in templates:
+            f.write((json.dumps(template) + "\n").encode())
+            count += 1
+        return count
+
+    def load_stream(self, f):
+        first = f.readline()
+        if first.strip():
+            header = json.loads(first)
+            if "__header__" in header:
+                _check_version(header["__version__"])
+            else: # JSON Lines without a header, e.g. written by HyperParameters.save_many
+                yield header
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+class BinarySerializer(Serializer):
+    """
+    Header: magic, schema version (uint16) and marshal version (uint8), then one record per template:
+    its length (uint32) followed by the marshalled template. Files must be read with a Python version
+    that supports the marshal version they were written with.
+    """
+    name, magic = "binary", b"TAsm"
+    header = struct.Struct(">4sHB")
+    length = struct.Struct(">I")
+
+    def _header(self):
+        return self.header.pack(self.magic, SCHEMA_VERSION, marshal.version)
+
+    def _check_header(self, data):
+        if len(data) != self.header.size:
+            raise ValueError(f"Truncated {self.name} data, it ends within the header")
+        magic, version, marshal_version = self.header.unpack(data)
+        if magic != self.magic:
+            raise ValueError(f"Not {self.name} serialized data")
+        _check_version(version)
+        if marshal_version > marshal.version:
+            raise ValueError(f"Data was written with marshal version {marshal_version}, this Python supports up to {marshal.version}")
+
+    def dumps(self, template):
+        record = marshal.dumps(template)
+        return self._header() + self.length.pack(len(record)) + record
+
+    def loads(self, data):
+        self._check_header(data[:self.header.size])
+        start = self.header.size + self.length.size
+        if len(data) < start or self.length.unpack_from(data, self.header.size)[0] != len(data) - start:
+            raise ValueError(f"Truncated {self.name} data, its length does not match the length prefix")
+        return self._record(data[start:])
+
+    @staticmethod
+    def _record(record):
+        try:
+            return marshal.loads(record)
+        except (EOFError, TypeError) as e: # Corrupt record of the right length
+            raise ValueError(f"Corrupt record: {e}") from e
+
+    def dump_stream(self, templates, f):
+        f.write(self._header())
+        count = 0
+        for template in templates:
+            record = marshal.dumps(template)
+            f.write(self.length.pack(len(record)) + record)
+            count += 1
+        return count
+
+    def load_stream(self, f):
+        self._check_header(f.read(self.header.size))
+        while len(prefix := f.read(self.length.size)) == self.length.size:
+            size = self.length.unpack(prefix)[0]
+            if len(record := f.read(size)) != size:
+                raise ValueError("Truncated stream")
+            yield self._record(record)
+        if prefix: # Stream ends within a length prefix
+            raise ValueError("Truncated stream")
+
+SERIALIZERS = {}
+
+def register(serializer):
+    """Makes 'serializer' available by name, and detectable by its magic bytes when loading."""
+    SERIALIZERS[serializer.name] = serializer
+    return serializer
+
+register(JSONSerializer())
+register(BinarySerializer())
+
+def get_serializer(format):
+    if format not in SERIALIZERS:
+        raise ValueError(f"Format '{format}' not supported, choose one of {list(SERIALIZERS)}")
+    return SERIALIZERS[format]
+
+def detect(prefix):
+    """Serializer that wrote data starting with the bytes 'prefix', JSON if no magic bytes match."""
+    for serializer in SERIALIZERS.values():
+        if serializer.magic is not None and prefix.startswith(serializer.magic):
+            return serializer
+    return SERIALIZERS["json"]
+
+def to_template(obj):
+    """Template of a BluePrint or HyperParameters (the latter also records the id of its BluePrint)."""
+    if isinstance(obj, BluePrint):
+        return BluePrintEncoder().default(obj)
+    elif isinstance(obj, HyperParameters):
+        return {**HyperParametersEncoder().default(obj), "__blueprint__": obj.blueprint.id}
+    raise TypeError(f"Can only serialize BluePrint or HyperParameters, got {type(obj)}")
+
+def from_template(template, blueprint=None, blueprints=None, lazy=False, bases=None, base_dir=None):
+    """
+    Rebuilds a BluePrint or HyperParameters from its template, without checking values again.
+    Input:
+        template (dict): As returned by to_template (or read from a saved file)
+        blueprint (BluePrint): BluePrint of HyperParameters, defaults to the one with the recorded id in 'blueprints'
+        blueprints (dict): BluePrint id -> BluePrint, e.g. BluePrints decoded earlier in the same stream
+        lazy (bool): Decode classes of HyperParameters as Utils.LazyClass
+        bases (dict): HyperParameters id -> HyperParameters, bases for files saved with HyperParameters.save(delta=True),
+            e.g. HyperParameters decoded earlier in the same stream
+        base_dir (path-like): Directory to load bases that are not in 'bases' from, as HyperParameters.load does
+    """
+    if "__modules__" in template:
+        bp = BluePrint(template["id"], skip_prompts=True)
+        vars(bp).update(BluePrintDecoder().object_hook(template))
+        bp._validators.clear()
+        return bp
+    if blueprint is None:
+        blueprint = (blueprints or {}).get(template.get("__blueprint__"))
+        if blueprint is None:
+            raise ValueError(f"BluePrint '{template.get('__blueprint__')}' of Hyperparameters '{template['id']}' is not known, pass it as 'blueprint'")
+    kwargs = HyperParametersDecoder(lazy=lazy).object_hook(template)
+    hparams = HyperParameters(template["id"], blueprint)
+    if (base_id := kwargs.pop("__base__", None)) is not None:
+        base = (bases or {}).get(base_id)
+        if base is None:
+            if base_dir is None:
+                raise ValueError(f"Base '{base_id}' of Hyperparameters '{template['id']}' is not known, pass it in 'bases'")
+            base = hparams._load_base(Path(base_dir), base_id, lazy)
+        hparams._set_base(base)
+    return hparams._apply(kwargs)
+
+def dumps(obj, format="json"):
+    return get_serializer(format).dumps(to_template(obj))
+
+def loads(data, blueprint=None, lazy=False, bases=None):
+    """Object serialized by dumps, in any registered format (see from_template for 'blueprint', 'lazy' and 'bases')."""
+    return from_template(detect(data[:16]).loads(data), blueprint, lazy=lazy, bases=bases)
+
+def dump(obj, path, format="json"):
+    """Writes one BluePrint or HyperParameters to 'path', replacing the file atomically."""
+    atomic_write(path, dumps(obj, format))
+
+def load(path, blueprint=None, lazy=False):
+    """Object written by dump (or saved by BluePrint.save / HyperParameters.save), bases are loaded from the same directory."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return from_template(detect(data[:16]).loads(data), blueprint, lazy=lazy, base_dir=Path(path).parent)
+
+def dump_many(objs, path, format="json"):
+    """
+    Streams BluePrints and HyperParameters to a single file, consuming 'objs' lazily.
+    BluePrints written before their HyperParameters are used to rebuild them by load_many.
+    Output:
+        Number of objects written
+    """
+    with open(path, "wb") as f:
+        return get_serializer(format).dump_stream((to_template(obj) for obj in objs), f)
+
+def load_many(path, blueprint=None, lazy=False):
+    """Lazily yields every object written by dump_many, one record is decoded at a time (see from_template)."""
+    blueprints = {}
+    with open(path, "rb") as f:
+        serializer = detect(f.peek(16)[:16])
+        for template in serializer.load_stream(f):
+            obj = from_template(template, blueprint, blueprints, lazy, base_dir=Path(path).parent)
+            if isinstance(obj, BluePrint):
+                blueprints[obj.id] = obj
+            yield obj
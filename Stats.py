@@ -0,0 +1,84 @@
+import json, time, threading
+from contextlib import contextmanager
+"""
+Opt-in counters and timers for BluePrint, HyperParameters and their helpers.
+Disabled by default, instrumented code only checks 'Stats.enabled' before recording anything.
+Example Use:
+    Stats.enable()
+    run_sweep()
+    print(Stats.snapshot())
+"""
+enabled = False
+_counters = {} # Name -> count
+_timers = {} # Name -> [calls, seconds, bytes]
+_lock = threading.Lock()
+_dumper = None
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+def disable():
+    enable(False)
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def record(name, seconds, nbytes=0):
+    """Records one call of 'name' that took 'seconds' and read or wrote 'nbytes'."""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = [0, 0.0, 0]
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] += nbytes
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+def snapshot():
+    """
+    Copy of all counters and timers.
+    Output:
+        {"counters": {name: count}, "timers": {name: {"calls", "seconds", "mean_seconds", "bytes"}}}
+    """
+    with _lock:
+        return {"counters": dict(_counters),
+                "timers": {name: {"calls": calls, "seconds": seconds, "mean_seconds": seconds / calls, "bytes": nbytes}
+                           for name, (calls, seconds, nbytes) in _timers.items()}}
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+def start_periodic_dump(path, interval=60.0):
+    """Appends a timestamped snapshot to the JSON Lines file 'path' every 'interval' seconds, until stop_periodic_dump."""
+    global _dumper
+    stop_periodic_dump()
+    stop = threading.Event()
+    def dump():
+        while not stop.wait(interval):
+            _dump(path)
+        _dump(path) # Final snapshot when stopped
+    _dumper = (stop, threading.Thread(target=dump, name="Stats.dump", daemon=True))
+    _dumper[1].start()
+
+def stop_periodic_dump():
+    global _dumper
+    if _dumper is not None:
+        stop, thread = _dumper
+        stop.set()
+        thread.join()
+        _dumper = None
+
+def _dump(path):
+    with open(path, "a") as f:
+        f.write(json.dumps({"time": time.time(), **snapshot()}) + "\n")
@@ -0,0 +1,203 @@
+import os, sys, json, sqlite3, inspect
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from HyperParameters import HyperParameters, HyperParametersEncoder, HyperParametersDecoder
+from Utils import LazyClass, qualified_name
+
+OPERATORS = ["==", "!=", "<", "<=", ">", ">="]
+
+def _column(value):
+    """Maps a hyper-parameter value onto the (num, text) columns of the params table, classes are stored by qualified name."""
+    if type(value) in [int, bool, float]:
+        return value, None
+    elif type(value) is str:
+        return None, value
+    elif inspect.isclass(value) or isinstance(value, LazyClass):
+        return None, qualified_name(value)
+    return None, None # Not saved by HyperParametersEncoder either
+
+class HyperParametersStore(object):
+    """
+    Single-file SQLite store for many HyperParameters.
+    Every configuration is stored in the same format as 'HyperParameters_{id}.json', and each
+    of its values is also indexed by key so configurations can be queried by value.
+    Example:
+        with HyperParametersStore("sweep.db") as store:
+            store.insert_many(Sweep.grid_search(bp, batch_size=64))
+            ids = store.query(("optimizer", "==", torch.optim.Adam), ("batch_size", ">=", 64))
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path)
+        with self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS configs (id TEXT PRIMARY KEY, blueprint TEXT, data TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS params (id TEXT NOT NULL, key TEXT NOT NULL, num REAL, text TEXT);
+                CREATE INDEX IF NOT EXISTS params_id ON params (id);
+                CREATE INDEX IF NOT EXISTS params_num ON params (key, num);
+                CREATE INDEX IF NOT EXISTS params_text ON params (key, text);
+            """)
+
+    def insert(self, hparams):
+        return self.insert_many([hparams])
+
+    def insert_many(self, hparams):
+        """Inserts (or replaces) every HyperParameters in the iterable 'hparams' within a single transaction."""
+        with self.connection:
+            for h in hparams:
+                self._insert(h.id, h.blueprint.id, json.dumps(h, cls=HyperParametersEncoder), h.to_dict())
+        return self
+
+    def _insert(self, id, blueprint_id, data, values):
+        self.connection.execute("INSERT OR REPLACE INTO configs VALUES (?, ?, ?)", (id, blueprint_id, data))
+        self.connection.execute("DELETE FROM params WHERE id = ?", (id,))
+        self.connection.executemany("INSERT INTO params VALUES (?, ?, ?, ?)",
+            [(id, k, *columns) for k, v in values.items() if (columns := _column(v)) != (None, None)])
+
+    def load(self, id, blueprint, lazy=False):
+        """Loads HyperParameters 'id' from the store, checked against 'blueprint' when it was saved (see HyperParameters.load for 'lazy')."""
+        row = self.connection.execute("SELECT data FROM configs WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            raise KeyError(f"HyperParameters '{id}' not in store {self.path}")
+        return HyperParameters(id, blueprint)._apply(json.loads(row[0], cls=HyperParametersDecoder, lazy=lazy))
+
+    def load_many(self, ids, blueprint, lazy=False):
+        """Lazily loads HyperParameters for every id in 'ids'."""
+        for id in ids:
+            yield self.load(id, blueprint, lazy)
+
+    def ids(self, blueprint_id=None):
+        if blueprint_id is None:
+            return [id for id, in self.connection.execute("SELECT id FROM configs ORDER BY id")]
+        return [id for id, in self.connection.execute("SELECT id FROM configs WHERE blueprint = ? ORDER BY id", (blueprint_id,))]
+
+    def query(self, *conditions):
+        """
+        Ids of all HyperParameters satisfying every condition, using the (key, value) indices.
+        Input:
+            Conditions of the form (key, operator, value), with operator one of ==, !=, <, <=, >, >=.
+            Classes are compared by qualified name, ordering operators are meant for numeric values.
+        Output:
+            Sorted list of ids
+        """
+        if len(conditions) == 0:
+            return self.ids()
+        queries, params = [], []
+        for key, op, value in conditions:
+            if op not in OPERATORS:
+                raise ValueError(f"Operator '{op}' not supported, choose one of {OPERATORS}")
+            num, text = _column(value)
+            if num is None and text is None:
+                raise TypeError(f"Value '{value}' for key '{key}' can not be queried")
+            column = "num" if text is None else "text"
+            queries.append(f"SELECT id FROM params WHERE key = ? AND {column} {'=' if op == '==' else op} ?")
+            params.extend([key, num if text is None else text])
+        sql = " INTERSECT ".join(queries) + " ORDER BY id"
+        return [id for id, in self.connection.execute(sql, params)]
+
+    def export_json(self, custom_dir=None, ids=None):
+        """Writes stored configurations to the one-file-per-id layout, 'HyperParameters_{id}.json' in 'custom_dir'."""
+        dir_path = HyperParameters.directory(custom_dir)
+        for id in (self.ids() if ids is None else ids):
+            data, = self.connection.execute("SELECT data FROM configs WHERE id = ?", (id,)).fetchone()
+            with open(dir_path / f"HyperParameters_{id}.json", "w") as f:
+                f.write(data)
+
+    def import_json(self, blueprint, custom_dir=None):
+        """Inserts every 'HyperParameters_{id}.json' in 'custom_dir', checked against 'blueprint'."""
+        dir_path = HyperParameters.directory(custom_dir)
+        with self.connection:
+            for id in HyperParameters.saved_ids(dir_path):
+                with open(dir_path / f"HyperParameters_{id}.json", "r") as f:
+                    data = f.read()
+                values = json.loads(data, cls=HyperParametersDecoder, lazy=True) # Only names are indexed
+                # Replay changes saved with changelog=True, and resolve the base of overlays saved with delta=True
+                if "__base__" in values or (dir_path / f"HyperParameters_{id}.changes.jsonl").exists():
+                    hparams = HyperParameters(id, blueprint).load(dir_path, lazy=True)
+                    data, values = json.dumps(hparams, cls=HyperParametersEncoder), hparams.to_dict()
+                self._insert(id, blueprint.id, data, values)
+        return self
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM configs").fetchone()[0]
+
+    def __contains__(self, id):
+        return self.connection.execute("SELECT 1 FROM configs WHERE id = ?", (id,)).fetchone() is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FingerprintIndex(object):
+    """
+    Persistent map from HyperParameters fingerprints (see HyperParameters.fingerprint) to the id of the configuration
+    they were added for, e.g. of configurations that already ran. Lookups go by fingerprint, so configurations that share
+    an id never mix up. Stored as one 'fingerprint id' line per entry, appended atomically, so several processes can share
+    the same index file and see each other's additions.
+    Example:
+        index = FingerprintIndex("sweep.fingerprints")
+        for hparams in Sweep.grid_search(bp):
+            if hparams in index: continue
+            run(hparams)
+            index.add(hparams)
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fingerprints = {} # Fingerprint -> id (None if added as a bare fingerprint)
+        self._offset = 0 # Bytes of the file already read
+        self.refresh()
+
+    def refresh(self):
+        """Reads fingerprints appended (e.g. by other processes) since the last refresh."""
+        if not self.path.exists() or self.path.stat().st_size == self._offset:
+            return self
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        complete = data.rfind(b"\n") + 1 # Ignore a line that is still being written
+        for line in data[:complete].decode().splitlines():
+            fingerprint, _, id = line.partition(" ")
+            self.fingerprints.setdefault(fingerprint, id or None)
+        self._offset += complete
+        return self
+
+    def add(self, item, id=None):
+        """Adds HyperParameters (or a fingerprint and optionally the 'id' of its configuration) to the index."""
+        fingerprint = self._fingerprint(item)
+        id = id if type(item) is str else item.id
+        if fingerprint not in self.fingerprints:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+            try:
+                os.write(fd, (fingerprint if id is None else f"{fingerprint} {id}").encode() + b"\n")
+            finally:
+                os.close(fd)
+            self.fingerprints[fingerprint] = id
+        return fingerprint
+
+    def get(self, item, default=None):
+        """Id of the configuration HyperParameters (or a fingerprint) were first added for."""
+        fingerprint = self._fingerprint(item)
+        if fingerprint not in self.fingerprints:
+            self.refresh()
+        return self.fingerprints.get(fingerprint, default)
+
+    def _fingerprint(self, item):
+        return item if type(item) is str else item.fingerprint()
+
+    def __contains__(self, item):
+        fingerprint = self._fingerprint(item)
+        return fingerprint in self.fingerprints or fingerprint in self.refresh().fingerprints
+
+    def __len__(self):
+        return len(self.refresh().fingerprints)
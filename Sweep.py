@@ -0,0 +1,130 @@
+import sys, math, random, logging
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from BluePrint import Range
+from HyperParameters import HyperParameters
+
+def search_space(blueprint):
+    """
+    Hyper-parameters of a BluePrint that can be enumerated, i.e. those constrained by a list of classes.
+    Input:
+        BluePrint
+    Output:
+        List of (key, options) pairs, sorted by key so every worker sees the same ordering
+    """
+    return sorted((k, v) for k, v in vars(blueprint).items() if type(v) is list and not k.startswith("_"))
+
+def range_space(blueprint):
+    """Hyper-parameters of a BluePrint constrained by a Range, as sorted (key, Range) pairs. These are sampled but not enumerated."""
+    return sorted(((k, v) for k, v in vars(blueprint).items() if isinstance(v, Range) and not k.startswith("_")), key=lambda kv: kv[0])
+
+def grid_size(blueprint, **fixed):
+    """Number of combinations in the cartesian grid over a BluePrint's list constraints."""
+    return math.prod(len(options) for k, options in search_space(blueprint) if k not in fixed)
+
+def _shard(total, start, stop, shard_index, num_shards):
+    if not 0 <= shard_index < num_shards:
+        raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+    return range(total)[start:stop][shard_index::num_shards]
+
+def _make(index, id_prefix, blueprint, custom_dir, log_level, fixed, values):
+    return HyperParameters(f"{id_prefix}{index}", blueprint, custom_dir=custom_dir, log_level=log_level, **fixed, **values)
+
+def grid_search(blueprint, id_prefix="grid_", start=0, stop=None, shard_index=0, num_shards=1,
+                custom_dir=None, log_level=logging.INFO, **fixed):
+    """
+    Lazily yields every combination of a BluePrint's list constraints as HyperParameters.
+    Combination i is decoded directly from its index (mixed radix), so nothing is materialized
+    and any slice of the grid can be generated without walking the combinations before it.
+    Input:
+        blueprint (BluePrint): Constraints to enumerate
+        id_prefix (str): HyperParameters are given the id '{id_prefix}{index}'
+        start, stop (int): Slice of the grid to generate (like range(total)[start:stop])
+        shard_index, num_shards (int): Worker 'shard_index' of 'num_shards' takes every num_shards-th index of the slice
+        **fixed: Values for hyper-parameters that are not enumerated (also overrides list constraints)
+    Output:
+        Generator of HyperParameters
+    """
+    space = [(k, options) for k, options in search_space(blueprint) if k not in fixed]
+    total = math.prod(len(options) for _, options in space)
+    for index in _shard(total, start, stop, shard_index, num_shards):
+        values, rest = {}, index
+        for k, options in reversed(space): # Last key varies fastest
+            rest, digit = divmod(rest, len(options))
+            values[k] = options[digit]
+        yield _make(index, id_prefix, blueprint, custom_dir, log_level, fixed, values)
+
+def random_search(blueprint, n, seed=0, id_prefix="random_", start=0, stop=None, shard_index=0, num_shards=1,
+                  custom_dir=None, log_level=logging.INFO, **fixed):
+    """
+    Lazily yields 'n' seeded random samples of a BluePrint's list and Range constraints as HyperParameters.
+    Sample i only depends on (seed, i), so shards of the same sweep never overlap and are reproducible.
+    Input:
+        blueprint (BluePrint): Constraints to sample from
+        n (int): Number of samples in the sweep
+        seed (int): Seed of the sweep
+        id_prefix, start, stop, shard_index, num_shards, **fixed: See grid_search
+    Output:
+        Generator of HyperParameters
+    """
+    space = [(k, options) for k, options in search_space(blueprint) if k not in fixed]
+    ranges = [(k, r) for k, r in range_space(blueprint) if k not in fixed]
+    for index in _shard(n, start, stop, shard_index, num_shards):
+        rng = random.Random(f"{seed}:{index}")
+        values = {k: rng.choice(options) for k, options in space}
+        values.update((k, r.sample(rng)) for k, r in ranges)
+        yield _make(index, id_prefix, blueprint, custom_dir, log_level, fixed, values)
+
+def sample_batch(blueprint, n, seed=0, **fixed):
+    """
+    Draws 'n' random configurations of a BluePrint's list and Range constraints in one vectorized call, e.g. to pre-filter
+    a large number of candidates before creating HyperParameters for the survivors. Requires NumPy.
+    Example Use:
+        batch = sample_batch(bp, 100_000, lr=0.01)
+        keep = batch["batch_size"] * batch["epochs"] <= 10_000
+        for i, values in enumerate(rows(batch, keep)): HyperParameters(f"batch_{i}", bp, **values)
+    Input:
+        blueprint (BluePrint): Constraints to sample from
+        n (int): Number of configurations
+        seed (int): Seed of the batch (batches are reproducible, but not identical to random_search's samples)
+        **fixed: Values for hyper-parameters that are not sampled
+    Output:
+        Dictionary of key -> NumPy array of length n, object arrays for class-valued keys and fixed values
+    """
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError("sample_batch requires NumPy, install it with 'pip install numpy'") from e
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for k, options in search_space(blueprint):
+        if k not in fixed:
+            choices = np.empty(len(options), dtype=object)
+            choices[:] = options
+            columns[k] = choices[rng.integers(len(options), size=n)]
+    for k, r in range_space(blueprint):
+        if k not in fixed:
+            columns[k] = r.sample_many(rng, n)
+    for k, v in fixed.items():
+        columns[k] = np.empty(n, dtype=object)
+        columns[k].fill(v)
+    return columns
+
+def rows(columns, mask=None):
+    """
+    Yields the configurations of a batch (see sample_batch) as dictionaries of Python values.
+    Input:
+        columns (dict): Key -> array, as returned by sample_batch
+        mask (array of bool): Only yield the configurations where mask is True
+    Output:
+        Generator of dictionaries, ready to be passed to HyperParameters as keyword arguments
+    """
+    if mask is not None:
+        columns = {k: column[mask] for k, column in columns.items()}
+    lists = {k: column.tolist() for k, column in columns.items()} # NumPy scalars to int / float
+    for values in zip(*lists.values()):
+        yield dict(zip(lists, values))
@@ -1,21 +1,127 @@
-def class_from_string(s):
+import builtins, importlib, os, time, tempfile
+from contextlib import contextmanager
+import Stats
+try:
+    import fcntl
+except ImportError: # Not on Windows, file_lock does not lock there
+    fcntl = None
+
+__all__ = ["class_from_string", "qualified_name", "resolve_class", "LazyClass", "atomic_write", "file_lock", "str2bool",
+           "valid_dir_path", "parse_key_value_pairs"]
+
+_classes = {} # Qualified name -> class, shared by every decoder in the process
+
+def class_from_string(s, lazy=False):
     """
     Flexibly evaluates a string qualifier to allow for non-standard package hierarchies.
+    Resolved classes are cached, so each qualifier is only imported once per process.
     Input: 
         Full object qualifier (str). Composed of module followed by class name 'MODULE_NAME.CLASS_NAME'
+        lazy (bool): Return a LazyClass that only imports the class when it is first used
     Output:
-        Class
+        Class (or LazyClass)
     """
-    try:
-        cls = eval(s) # E.g. torch.nn.modules.loss.BSEloss
+    cls = _classes.get(s)
+    if cls is not None:
+        if Stats.enabled: Stats.count("utils.class_from_string.cached")
         return cls
-    except:
-        pass
-    parts = s.split(".")
+    if lazy:
+        return LazyClass(s)
+    start = time.perf_counter()
+    cls = _classes[s] = _resolve(s)
+    if Stats.enabled: Stats.record("utils.class_from_string", time.perf_counter() - start)
+    return cls
+
+def _resolve(s):
+    if "." not in s: # E.g. int
+        return getattr(builtins, s)
+    module_name, name = s.rsplit(".", 1)
      # E.g. torch.optim.asgd.ASGD -> torch.optim.ASGD
-    exec(f"from {'.'.join(parts[:-1])} import {parts[-1]}") # Try to import appropriate module
-    return eval(parts[-1]) 
+    module = importlib.import_module(module_name) # Try to import appropriate module
+    try:
+        return getattr(module, name)
+    except AttributeError: # Submodule that is not imported by its parent
+        return importlib.import_module(s)
+
+def qualified_name(cls):
+    """Inverse of class_from_string, 'MODULE_NAME.CLASS_NAME' for a class (or LazyClass)."""
+    if isinstance(cls, LazyClass):
+        return cls.qualname
+    return f"{cls.__module__}.{cls.__name__}"
+
+def resolve_class(item):
+    """Class a LazyClass stands in for, any other item is returned unchanged."""
+    return item.resolve() if isinstance(item, LazyClass) else item
+
+class LazyClass(object):
+    """
+    Placeholder for a class that is only imported when it is first called or one of its attributes is accessed.
+    Only compares equal to LazyClasses with the same qualified name (so comparisons do not import anything),
+    compare resolve_class(lazy) to compare it with classes.
+    """
+    __slots__ = ("qualname", "_cls")
+
+    def __init__(self, qualname):
+        self.qualname = qualname
+        self._cls = None
+
+    def resolve(self):
+        if self._cls is None:
+            self._cls = class_from_string(self.qualname)
+        return self._cls
 
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith("_"): # E.g. __reduce_ex__ or __setstate__ looked up by pickle and copy, possibly before _cls is set
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __reduce__(self):
+        return (LazyClass, (self.qualname,)) # Stays lazy, e.g. in the payloads sent to worker processes
+
+    def __eq__(self, other):
+        if not isinstance(other, LazyClass):
+            return NotImplemented
+        return self.qualname == other.qualname
+
+    def __hash__(self):
+        return hash(self.qualname)
+
+    def __repr__(self):
+        return f"LazyClass('{self.qualname}')"
+
+def atomic_write(path, data, fsync=False):
+    """
+    Writes 'data' (bytes) to 'path' via a temporary file in the same directory that is then renamed,
+    so readers (and crashes) never see a partially written file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+@contextmanager
+def file_lock(path):
+    """
+    Holds an exclusive lock on the file 'path' (created if needed) for the duration of the block, across processes.
+    Used around read-modify-write updates of files shared by several processes, e.g. with atomic_write.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd) # Releases the lock
 
 def str2bool(v):
     """
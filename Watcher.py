@@ -0,0 +1,132 @@
+import os, sys, threading
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+import Stats
+
+def _signature(path):
+    """(modification time, size) of a file, None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class Watcher(object):
+    """
+    Hot-reloads HyperParameters from 'HyperParameters_{id}.json' (and its change log) when the file changes,
+    e.g. to adjust a long-running training process. Files are only parsed again when their modification time or size changed.
+    A changed 'BluePrint_{id}.json' is loaded into a new BluePrint, the current and reloaded values are checked against it
+    and both are only swapped in if they all pass (the BluePrint instance shared with others is never modified).
+    Files that can not be read or are rejected are checked again on the next poll.
+    Values changed on disk replace unsaved changes made in this process.
+    Example Use:
+        watcher = Watcher(hparams, interval=5.0)
+        watcher.subscribe(lambda hparams, keys: scheduler.set_lr(hparams["lr"]) if "lr" in keys else None)
+        with watcher: # Polls in a background thread
+            train(hparams)
+    hparams (HyperParameters): Instance to keep up to date, assumed to match its file when the Watcher is created
+    custom_dir (path-like): Directory of the HyperParameters file, defaults to HyperParameters.dirPath
+    blueprint_dir (path-like): Directory of the BluePrint file, defaults to BluePrint.dirPath
+    interval (float): Seconds between polls of the background thread, see start
+    """
+
+    def __init__(self, hparams, custom_dir=None, blueprint_dir=None, interval=1.0):
+        self.hparams, self.interval = hparams, interval
+        self.path = Path(HyperParameters.dirPath if custom_dir is None else custom_dir) / f"HyperParameters_{hparams.id}.json"
+        self.changelog_path = HyperParameters._changelog_path(self.path)
+        self.blueprint_path = Path(BluePrint.dirPath if blueprint_dir is None else blueprint_dir) / f"BluePrint_{hparams.blueprint.id}.json"
+        self.lock = threading.RLock() # Held while values are swapped, hold it to read several values consistently
+        self.callbacks = []
+        self._signatures = self._current_signatures()
+        self._thread, self._stop = None, threading.Event()
+
+    def _current_signatures(self):
+        return _signature(self.blueprint_path), _signature(self.path), _signature(self.changelog_path)
+
+    def subscribe(self, callback):
+        """Registers callback(hparams, changed_keys), called after every reload that changed at least one value."""
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def poll(self):
+        """
+        Checks the files once and reloads them if they changed.
+        Output:
+            Set of keys whose value changed (empty if nothing changed or the reloaded values were rejected)
+        """
+        if Stats.enabled: Stats.count("watcher.polls")
+        with self.lock:
+            signatures = self._current_signatures()
+            if signatures == self._signatures:
+                return set()
+            blueprint = self.hparams.blueprint
+            try:
+                if signatures[0] != self._signatures[0] and signatures[0] is not None:
+                    blueprint = BluePrint(blueprint.id, skip_prompts=True, log_level=blueprint.logger.level).load(self.blueprint_path.parent)
+                kwargs = {} if signatures[1] is None else HyperParameters._read(self.path)[0]
+            except (ValueError, OSError) as e: # E.g. JSON written by a process that does not replace files atomically
+                self.hparams.logger.warning(f"Could not reload Hyperparameters '{self.hparams.id}' from {self.path}: {e!r}")
+                return set()
+            kwargs.pop("__base__", None) # Only values of this instance are reloaded, the base is not watched
+            values = {**self.hparams.to_dict(), **kwargs}
+            rejected = [k for k, v in values.items() if k in blueprint and not blueprint.check(k, v)]
+            if rejected:
+                if Stats.enabled: Stats.count("watcher.rejected")
+                self.hparams.logger.error(f"Values for {rejected} do not meet BluePrint '{blueprint.id}' constraints, keeping current values")
+                return set()
+            if blueprint is not self.hparams.blueprint:
+                self.hparams.blueprint = blueprint # Single assignment, other users of the previous BluePrint are not affected
+                self.hparams.logger.info(f"Reloaded BluePrint '{blueprint.id}' from: {self.blueprint_path}")
+            current = vars(self.hparams)
+            changed = {k: v for k, v in kwargs.items() if k not in current or current[k] != v}
+            if changed:
+                self.hparams._apply(changed) # Single update of the instance's values
+                self.hparams._dirty.difference_update(changed) # Same as on disk
+                if Stats.enabled: Stats.count("watcher.reloads")
+                self.hparams.logger.info(f"Reloaded {sorted(changed)} of Hyperparameters '{self.hparams.id}' from: {self.path}")
+            self._signatures = signatures # Only once the files were accepted, so rejected versions are checked again
+        if not changed:
+            return set()
+        keys = set(changed)
+        for callback in list(self.callbacks):
+            try:
+                callback(self.hparams, keys)
+            except Exception:
+                self.hparams.logger.exception(f"Callback {callback} failed for reloaded keys {sorted(keys)}")
+        return keys
+
+    def start(self):
+        """Polls every 'interval' seconds in a background (daemon) thread, until stop."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"Watcher.{self.hparams.id}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                self.hparams.logger.exception(f"Failed to poll Hyperparameters '{self.hparams.id}'")
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,216 @@
+import os, sys, json, time, uuid, random, socket, logging, threading
+from itertools import islice
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+from HyperParameters import HyperParameters, HyperParametersEncoder
+from Runner import TrialResult
+from Utils import atomic_write
+from log import setup_basic_logger
+import Stats
+
+STATES = ["pending", "claimed", "done", "failed"]
+CLAIM_BATCH = 64 # Pending files read from the directory at a time when claiming, tried in random order
+_random = random.SystemRandom() # Not copied by fork, so forked workers do not try the same files in the same order
+
+class Claim(object):
+    """A configuration claimed from a WorkQueue by this process, see WorkQueue.claim."""
+
+    def __init__(self, queue, id, hparams):
+        self.queue, self.id, self.hparams = queue, id, hparams
+        self.token = uuid.uuid4().hex # Claimed file of every claim has its own name, so a lost claim never touches another's
+        self.path = queue.path("claimed", id, self.token)
+        self.claimed_at = time.time()
+
+    def heartbeat(self):
+        """Marks the claim as alive. Returns False if the claim was lost, i.e. re-queued as stale (even if claimed again since)."""
+        try:
+            os.utime(self.path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, result=None):
+        """Moves the configuration to 'done' and records 'result'. Returns False if the claim was lost."""
+        return self._finish("done", TrialResult(self.id, result, None))
+
+    def fail(self, error):
+        """Moves the configuration to 'failed' and records 'error'. Returns False if the claim was lost."""
+        return self._finish("failed", TrialResult(self.id, None, error if isinstance(error, str) else repr(error)))
+
+    def _finish(self, state, result):
+        try: # Only the owner of the claim can move it, the result is written once that succeeded
+            os.rename(self.path, self.queue.path(state, self.id))
+        except FileNotFoundError: # Re-queued while running, another worker may run it again
+            self.queue.logger.warning(f"Claim on Hyperparameters '{self.id}' was lost before it finished")
+            return False
+        record = {**result._asdict(), "worker": self.queue.worker, "seconds": time.time() - self.claimed_at}
+        atomic_write(self.queue.result_path(state, self.id), json.dumps(record, default=repr).encode())
+        if Stats.enabled: Stats.count(f"workqueue.{state}")
+        return True
+
+class WorkQueue(object):
+    """
+    Queue of HyperParameters on a shared filesystem, for any number of worker processes on any number of nodes.
+    Every configuration is a 'HyperParameters_{id}.json' file in one of the directories pending/, claimed/, done/ or failed/
+    under custom_dir / 'queue_{name}'. Workers claim a configuration by renaming it from pending/ to claimed/, which
+    only one of them can do, adding a token of their claim to its name ('HyperParameters_{id}.{token}.json'). While running, they touch the claimed file as a heartbeat. Claims that have not seen a
+    heartbeat for 'stale_after' seconds are moved back to pending/ by any worker, so a configuration runs at least once
+    (more often if a worker stalls). The filesystem must support atomic rename, as NFS and local filesystems do.
+    Example Use:
+        WorkQueue("sweep").put_many(Sweep.grid_search(bp)) # On one node
+        WorkQueue("sweep").run(train, bp) # On every worker, returns once the queue is empty
+    name (str): Name of the queue
+    custom_dir (path-like): Directory to create the queue in, defaults to HyperParameters.directory()
+    stale_after (float): Seconds without heartbeat after which a claim is re-queued, should exceed clock skew between nodes
+    """
+
+    def __init__(self, name="default", custom_dir=None, stale_after=300.0, log_level=logging.INFO):
+        self.root = HyperParameters.directory(custom_dir) / f"queue_{name}"
+        self.stale_after = stale_after
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = setup_basic_logger(None, log_level, f"workqueue_{name}.log") # Local logs, not on the shared filesystem
+        for state in STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+
+    def path(self, state, id, token=None):
+        """File of configuration 'id' in 'state', claimed files also carry the token of their Claim."""
+        return self.root / state / f"HyperParameters_{id}{'' if token is None else '.' + token}.json"
+
+    def result_path(self, state, id):
+        return self.root / state / f"Result_{id}.json"
+
+    def ids(self, state="pending"):
+        """Ids of the configurations in 'state', one of pending, claimed, done or failed."""
+        return [id for id, _ in self._files(state)]
+
+    def _files(self, state):
+        """(id, path) of every configuration in 'state', sorted by id."""
+        with os.scandir(self.root / state) as entries:
+            return sorted(self._iter_files(state, entries))
+
+    def _iter_files(self, state, entries):
+        for entry in entries:
+            if entry.name.startswith("HyperParameters_") and entry.name.endswith(".json"):
+                id = entry.name[len("HyperParameters_"):-len(".json")]
+                yield (id.rsplit(".", 1)[0] if state == "claimed" else id), Path(entry.path) # Without the token
+
+    def _candidates(self):
+        """
+        (id, path) of pending configurations to try to claim, read lazily from the directory CLAIM_BATCH at a time
+        and shuffled within each batch, so a claim does not list the whole queue and workers do not all race for the same file.
+        """
+        with os.scandir(self.root / "pending") as entries:
+            files = self._iter_files("pending", entries)
+            while batch := list(islice(files, CLAIM_BATCH)):
+                _random.shuffle(batch)
+                yield from batch
+
+    def counts(self):
+        return {state: len(self.ids(state)) for state in STATES}
+
+    def put(self, hparams):
+        return self.put_many([hparams])
+
+    def put_many(self, hparams):
+        """Enqueues every HyperParameters in the iterable 'hparams', replacing pending configurations with the same id."""
+        count = 0
+        for h in hparams:
+            atomic_write(self.path("pending", h.id), json.dumps(h, cls=HyperParametersEncoder).encode())
+            count += 1
+        if Stats.enabled: Stats.count("workqueue.put", count)
+        return count
+
+    def claim(self, blueprint, lazy=False):
+        """
+        Claims a pending configuration (not necessarily the first), re-queuing stale claims if none is pending.
+        Input:
+            blueprint (BluePrint): BluePrint of the claimed HyperParameters
+            lazy (bool): See HyperParameters.load
+        Output:
+            Claim, or None if the queue is empty
+        """
+        for attempt in range(2):
+            for id, path in self._candidates():
+                claim = Claim(self, id, None)
+                try: # Rename keeps the modification time of when the configuration was enqueued (or claimed before), which may look stale
+                    os.utime(path)
+                    os.rename(path, claim.path)
+                except FileNotFoundError: # Claimed by another worker first
+                    continue
+                try:
+                    claim.hparams = HyperParameters(id, blueprint)._apply(HyperParameters._read(claim.path, lazy)[0])
+                except FileNotFoundError: # Re-queued as stale (by a worker whose clock is far ahead) before it was read
+                    continue
+                if Stats.enabled: Stats.count("workqueue.claimed")
+                return claim
+            if attempt == 0 and not self.requeue_stale():
+                break
+        return None
+
+    def requeue_stale(self):
+        """Moves claims without a heartbeat for 'stale_after' seconds back to pending. Returns their ids."""
+        requeued, now = [], time.time()
+        for id, path in self._files("claimed"):
+            try:
+                if now - os.stat(path).st_mtime <= self.stale_after:
+                    continue
+                os.rename(path, self.path("pending", id))
+            except FileNotFoundError: # Finished or re-queued by another worker
+                continue
+            requeued.append(id)
+        if requeued:
+            if Stats.enabled: Stats.count("workqueue.requeued", len(requeued))
+            self.logger.warning(f"Re-queued stale claims: {requeued}")
+        return requeued
+
+    def results(self, states=("done", "failed")):
+        """Yields the TrialResult of every finished configuration."""
+        for state in states:
+            for id in self.ids(state):
+                try:
+                    with open(self.result_path(state, id), "r") as f:
+                        record = json.load(f)
+                except FileNotFoundError:
+                    continue
+                yield TrialResult(record["id"], record["result"], record["error"])
+
+    def run(self, trial_fn, blueprint, max_trials=None, heartbeat_interval=None, lazy=False):
+        """
+        Worker loop, claims and runs configurations until the queue is empty (or 'max_trials' ran).
+        A background thread sends heartbeats every 'heartbeat_interval' seconds (defaults to a third of stale_after).
+        Exceptions of trial_fn are recorded by moving the configuration to failed/.
+        Output:
+            Number of trials run
+        """
+        heartbeat_interval = self.stale_after / 3 if heartbeat_interval is None else heartbeat_interval
+        count = 0
+        while max_trials is None or count < max_trials:
+            claim = self.claim(blueprint, lazy)
+            if claim is None:
+                break
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(claim, stop, heartbeat_interval), daemon=True)
+            heartbeat.start()
+            try:
+                result = trial_fn(claim.hparams)
+            except Exception as e:
+                stop.set()
+                heartbeat.join()
+                self.logger.exception(f"Trial '{claim.id}' failed")
+                claim.fail(e)
+            else:
+                stop.set()
+                heartbeat.join()
+                claim.complete(result)
+            count += 1
+        return count
+
+    def _heartbeat(self, claim, stop, interval):
+        while not stop.wait(interval):
+            if not claim.heartbeat():
+                self.logger.warning(f"Claim on Hyperparameters '{claim.id}' was lost, it may run again elsewhere")
+                return
@@ -1,4 +1,28 @@
-from .BluePrint import BluePrint
-from .HyperParameters import HyperParameters
-from .Color import Color
-from .Utils import *
\ No newline at end of file
+import sys
+from pathlib import Path
+
+base_path = Path(__file__).parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+# The modules import each other by their top-level names (see base_path above), so re-export those same module objects.
+# Importing them relatively would load a second copy of every module, with its own classes and state.
+from BluePrint import BluePrint, Range
+from HyperParameters import HyperParameters, FrozenHyperParameters
+from Color import Color
+from Utils import *
+from Sweep import grid_search, random_search, sample_batch, rows
+from Runner import run_trials, arun_trials, TrialResult
+from Store import HyperParametersStore, FingerprintIndex
+from Cache import memoize
+from Scheduler import SuccessiveHalving, hyperband
+from Columnar import export_columns, open_columns, ColumnTable
+from Watcher import Watcher
+from Serialization import dump, load, dumps, loads, dump_many, load_many
+from WorkQueue import WorkQueue
+import Stats, log
+
+for _name in ["BluePrint", "HyperParameters", "Color", "Utils", "Sweep", "Runner", "Store", "Cache", "Scheduler", "Columnar",
+              "Watcher", "Serialization", "WorkQueue", "Stats", "log"]:
+    sys.modules.setdefault(f"{__name__}.{_name}", sys.modules[_name]) # E.g. 'import package.Sweep' gets the same module too
+del _name
@@ -0,0 +1,119 @@
+"""
+Throughput and latency of the BluePrint and HyperParameters hot paths, for a range of sizes.
+Size is the number of keys in the BluePrint / HyperParameters; accessor benchmarks perform one operation per key.
+Runs offline and writes machine-readable (JSON) results.
+Example Use:
+    python benchmarks/bench_hot_paths.py --sizes 10 1000 100000 --repeat 5 --output bench.json
+"""
+import sys, json, time, timeit, platform, argparse, tempfile, subprocess
+from contextlib import redirect_stdout
+from pathlib import Path
+
+base_path = Path(__file__).parent.parent
+if base_path.__str__() not in sys.path:
+    sys.path.append(base_path.__str__())
+
+import log
+from BluePrint import BluePrint, BluePrintEncoder, BluePrintDecoder
+from HyperParameters import HyperParameters, HyperParametersEncoder, HyperParametersDecoder
+import Serialization
+from tests import Dummy_Module
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+class Optimizer:
+    """Synthetic class-valued parameter whose defaults are bound from the HyperParameters."""
+    def __init__(self, params=None, key_0=0, key_1=0.0, key_3=False, lr=0.1):
+        pass
+
+CLASSES = [Dummy_Module.A, Dummy_Module.B, Dummy_Module.C, Optimizer]
+CONSTRAINTS = [int, float, CLASSES, bool] # Cycled over the keys, key_i gets CONSTRAINTS[i % 4]
+VALUES = [1, 0.5, Optimizer, True]
+
+def constraints(size):
+    return {f"key_{i}": CONSTRAINTS[i % len(CONSTRAINTS)] for i in range(size)}
+
+def values(size):
+    return {f"key_{i}": VALUES[i % len(VALUES)] for i in range(size)}
+
+def measure(name, size, fn, ops, repeat):
+    """Best of 'repeat' timings of fn(), which performs 'ops' operations."""
+    seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+    return {"name": name, "size": size, "ops": ops, "repeat": repeat, "seconds": seconds,
+            "latency_us": 1e6 * seconds / ops, "throughput_ops_s": ops / seconds if seconds > 0 else float("inf")}
+
+def run_size(size, repeat, tmp_dir):
+    results = []
+    kwargs, params = constraints(size), values(size)
+    keys = list(params)
+
+    results.append(measure("blueprint_construction", size, lambda: BluePrint("bench", custom_dir=tmp_dir, skip_prompts=True, **kwargs), 1, repeat))
+    bp = BluePrint("bench", custom_dir=tmp_dir, skip_prompts=True, **kwargs)
+    results.append(measure("blueprint_check", size, lambda: [bp.check(k, params[k]) for k in keys], size, repeat))
+    results.append(measure("blueprint_check_many", size, lambda: bp.check_many([params]), size, repeat))
+
+    results.append(measure("hyperparameters_construction", size, lambda: HyperParameters("bench", bp, custom_dir=tmp_dir, **params), 1, repeat))
+    hparams = HyperParameters("bench", bp, custom_dir=tmp_dir, **params)
+    class_keys = [k for k in keys if params[k] is Optimizer]
+    results.append(measure("hyperparameters_getitem_class", size, lambda: [hparams[k] for k in class_keys], max(len(class_keys), 1), repeat))
+    results.append(measure("hyperparameters_getitem", size, lambda: [hparams[k] for k in keys], size, repeat))
+    results.append(measure("hyperparameters_setitem", size, lambda: [hparams.__setitem__(k, params[k]) for k in keys], size, repeat))
+
+    results.append(measure("blueprint_json_round_trip", size, lambda: json.loads(json.dumps(bp, cls=BluePrintEncoder), cls=BluePrintDecoder), 1, repeat))
+    results.append(measure("hyperparameters_json_round_trip", size,
+                           lambda: json.loads(json.dumps(hparams, cls=HyperParametersEncoder), cls=HyperParametersDecoder), 1, repeat))
+
+    template = Serialization.to_template(hparams)
+    for format, serializer in Serialization.SERIALIZERS.items():
+        data = serializer.dumps(template)
+        results.append(measure(f"serialization_{format}_dumps", size, lambda: serializer.dumps(template), 1, repeat))
+        results.append(measure(f"serialization_{format}_loads", size, lambda: serializer.loads(data), 1, repeat))
+
+    results.append(measure("blueprint_save", size, lambda: bp.save(tmp_dir), 1, repeat))
+    results.append(measure("blueprint_load", size, lambda: BluePrint("bench", custom_dir=tmp_dir).load(tmp_dir), 1, repeat))
+    results.append(measure("hyperparameters_save", size, lambda: hparams.save(tmp_dir), 1, repeat))
+    results.append(measure("hyperparameters_load", size, lambda: HyperParameters("bench", bp, custom_dir=tmp_dir).load(tmp_dir), 1, repeat))
+    return results
+
+def import_time(repeat):
+    """Best of 'repeat' cold imports of BluePrint and HyperParameters, in a fresh interpreter each time."""
+    code = f"import sys, time; sys.path.insert(0, {base_path.__str__()!r}); t = time.perf_counter(); import BluePrint, HyperParameters; print(time.perf_counter() - t)"
+    seconds = min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout) for _ in range(repeat))
+    return {"name": "import", "size": 1, "ops": 1, "repeat": repeat, "seconds": seconds, "latency_us": 1e6 * seconds, "throughput_ops_s": 1 / seconds}
+
+def run(sizes=DEFAULT_SIZES, repeat=5, instance_logging=False):
+    dir_paths = BluePrint.dirPath, HyperParameters.dirPath
+    log.set_instance_logging(instance_logging)
+    results = [import_time(repeat)]
+    try:
+        with tempfile.TemporaryDirectory() as tmp, redirect_stdout(sys.stderr): # BluePrint.save prints, keep stdout for results
+            tmp_dir = Path(tmp)
+            BluePrint.dirPath, HyperParameters.dirPath = tmp_dir, tmp_dir
+            for size in sizes:
+                results.extend(run_size(size, repeat, tmp_dir))
+            log.flush()
+    finally:
+        BluePrint.dirPath, HyperParameters.dirPath = dir_paths
+        log.set_instance_logging(True)
+    return {"python": platform.python_version(), "platform": platform.platform(), "time": time.time(), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='>> Benchmark BluePrint and HyperParameters hot paths <<')
+    parser.add_argument('--sizes', dest="sizes", type=int, metavar='INT', nargs='+', default=DEFAULT_SIZES,
+                        help='Number of keys per BluePrint/HyperParameters to benchmark.')
+    parser.add_argument('--repeat', dest="repeat", type=int, metavar='INT', default=5,
+                        help='Repetitions of each benchmark, the best is reported.')
+    parser.add_argument('--log', dest="instance_logging", action="store_true",
+                        help='Keep per-instance logging enabled while benchmarking.')
+    parser.add_argument('--output', dest="output", type=str, metavar='STR', default=None,
+                        help='JSON file to write results to, defaults to stdout.')
+    args = parser.parse_args()
+    report = run(args.sizes, args.repeat, args.instance_logging)
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        for r in report["results"]:
+            print(f"{r['name']:<35} size={r['size']:<7} {r['latency_us']:>12.2f} us/op {r['throughput_ops_s']:>14.0f} ops/s")
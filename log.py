@@ -1,25 +1,153 @@
-import logging, sys
-from contextlib import redirect_stdout
+import logging, logging.handlers, os, sys, queue, atexit, threading
+from collections import OrderedDict
 from pathlib import Path
+import Stats
 """
 Credit: @Aldo (Feb 20 2020)
 Modified by: @deuce1957 (Jan 16 2021)
 """
 logger = None
 
+log_format = '%(levelname)s %(asctime)s %(message)s'
+max_open_files = 64 # Log files the background thread keeps open at once
+_instance_logging = True # Whether BluePrint and HyperParameters instances log at all
+_lock = threading.Lock()
+_listener = None
+
+class RoutingHandler(logging.Handler):
+    """
+    Writes records taken off the shared log queue to the file they were logged for.
+    Log files are opened once a record for them arrives and at most 'max_open' stay open: the least recently written
+    one is closed, and reopened for appending by its next record.
+    """
+    def __init__(self, max_open=max_open_files):
+        logging.Handler.__init__(self)
+        self.max_open = max_open
+        self.files = OrderedDict() # Log file path -> FileHandler, least recently written first
+
+    def emit(self, record):
+        if hasattr(record, "flushed"): # Sentinel of flush(), every record queued before it has been written
+            for file_handler in self.files.values():
+                file_handler.flush()
+            record.flushed.set()
+            return
+        file_handler = self.files.get(record.log_path)
+        if file_handler is None:
+            file_handler = self.files[record.log_path] = logging.FileHandler(record.log_path, mode="a")
+            file_handler.setFormatter(logging.Formatter(log_format))
+            while len(self.files) > self.max_open:
+                self.files.popitem(last=False)[1].close()
+            if Stats.enabled: Stats.count("log.files_opened")
+        else:
+            self.files.move_to_end(record.log_path)
+        file_handler.handle(record)
+
+    def close_files(self, path=None):
+        """Closes the log file 'path', or every open log file if None."""
+        self.acquire()
+        try:
+            for p in list(self.files) if path is None else [path]:
+                file_handler = self.files.pop(p, None)
+                if file_handler is not None:
+                    file_handler.close()
+        finally:
+            self.release()
+
+    def close(self):
+        self.close_files()
+        logging.Handler.close(self)
+
+class FileQueueHandler(logging.handlers.QueueHandler):
+    """
+    Non-blocking handler, puts records on the shared log queue tagged with the file they should be written to.
+    The background thread writing them is only started by the first record (of each process).
+    """
+    def __init__(self, path):
+        logging.handlers.QueueHandler.__init__(self, None)
+        self.path = path
+
+    def prepare(self, record):
+        record = logging.handlers.QueueHandler.prepare(self, record)
+        record.log_path = self.path
+        return record
+
+    def enqueue(self, record):
+        (_listener or _start_listener()).queue.put_nowait(record)
+
+_router = RoutingHandler()
+_null_logger = logging.getLogger("TorchAssembly.disabled")
+_null_logger.disabled = True
+_null_logger.propagate = False
+
+def set_instance_logging(enabled):
+    """
+    Turns logging of BluePrint and HyperParameters instances on or off.
+    Instances created while it is off share a disabled logger, which avoids any file I/O for bulk workloads.
+    """
+    global _instance_logging
+    _instance_logging = enabled
+
+def _start_listener():
+    global _listener
+    with _lock:
+        if _listener is None:
+            listener = logging.handlers.QueueListener(queue.SimpleQueue(), _router)
+            listener.start()
+            _listener = listener
+        return _listener
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+atexit.register(_stop_listener)
+
+def _reset_in_child():
+    global _lock, _listener
+    _lock = threading.Lock() # May have been held by another thread when forking
+    _listener = None # Its thread is not copied into the child, the child's first record starts a new one (on a new queue, so records the parent still had queued are not written twice)
+    _router.files = OrderedDict() # Not closed, that would write out data the parent had buffered in them once more
+
+os.register_at_fork(after_in_child=_reset_in_child)
+
+def flush(timeout=None):
+    """
+    Blocks until every log record queued so far has been written to its file.
+    Output:
+        False if that took longer than 'timeout' seconds, True otherwise
+    """
+    listener = _listener
+    if listener is None:
+        return True
+    record = logging.makeLogRecord({"flushed": threading.Event()})
+    listener.queue.put_nowait(record)
+    return record.flushed.wait(timeout)
+
+def close(path=None):
+    """Writes the queued log records and closes the log file 'path' (every log file if None), the next record for it reopens it."""
+    flush()
+    _router.close_files(None if path is None else Path(path))
+
 def setup_basic_logger(custom_dir, log_level, filename, overwrite=False):
+    """
+    Logger for 'filename' in the 'logs' folder of 'custom_dir' (or the working directory).
+    Records are written by a single background thread, and each log file only ever gets one handler,
+    however many instances log to it.
+    """
+    if not _instance_logging:
+        return _null_logger
     logger = logging.getLogger(name=filename)
     logger.setLevel(log_level)
 
-    # Create file handler, log format and add the format to file handler
-    log_dir = Path.cwd() / "logs" if custom_dir is None else custom_dir / "logs"
-    log_dir.mkdir(exist_ok=True, parents=False)
-    file_handler = logging.FileHandler(log_dir / filename, mode="w" if overwrite else "a") # Will overwrite previous logfile!
-    log_format = '%(levelname)s %(asctime)s %(message)s'
-    formatter = logging.Formatter(log_format)
-    file_handler.setFormatter(formatter)
-
-    logger.addHandler(file_handler)
+    log_dir = Path.cwd() / "logs" if custom_dir is None else Path(custom_dir) / "logs"
+    path = log_dir / filename
+    with _lock:
+        if not any(isinstance(h, FileQueueHandler) and h.path == path for h in logger.handlers):
+            log_dir.mkdir(exist_ok=True, parents=False)
+            if overwrite:
+                open(path, "w").close() # Will overwrite previous logfile!
+            logger.addHandler(FileQueueHandler(path))
+            if Stats.enabled: Stats.count("log.handlers_created")
     return logger
 
 def log_decor(name="default", log_dir=Path.cwd() / "logs", level=logging.INFO, overwrite=False, tolerate_errors=False):
@@ -0,0 +1,16 @@
+import os, shutil, tempfile
+import pytest
+
+@pytest.fixture(scope="session", autouse=True)
+def temporary_working_directory():
+    """
+    Runs the tests from a temporary working directory that is removed afterwards, so the BluePrints/, HyperParameters/
+    and logs/ folders instances create there by default do not end up in the repository.
+    """
+    cwd, tmp = os.getcwd(), tempfile.mkdtemp(prefix="tests_")
+    os.chdir(tmp)
+    try:
+        yield tmp
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
@@ -0,0 +1,19 @@
+import unittest, sys
+
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent / "benchmarks"))
+import bench_hot_paths
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_smallest_size_runs(self):
+        report = bench_hot_paths.run(sizes=[10], repeat=1)
+        names = {r["name"] for r in report["results"]}
+        self.assertTrue({"import", "blueprint_check", "hyperparameters_getitem_class", "hyperparameters_save",
+                         "serialization_binary_loads"} <= names)
+        self.assertTrue(all(r["seconds"] >= 0 for r in report["results"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
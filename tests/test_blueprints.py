@@ -1,6 +1,9 @@
-import unittest, types, os
+import unittest, os, random, json, multiprocessing, argparse, logging, string
+from unittest import mock
 
-from BluePrint import BluePrint
+import BluePrint as BluePrintModule
+import Stats
+from BluePrint import BluePrint, Range
 from tests import Dummy_Module as Dummy_Module
 from pathlib import Path
 
@@ -54,6 +57,14 @@ class TestSaveAndReload(unittest.TestCase):
         bp2.load(self.dir)
         self.assertEqual(bp, bp2)
 
+    def test_reload_with_ranges(self):
+        bp = BluePrint("test", False, None, skip_prompts=True, lr=Range(1e-5, 1e-1, log=True), batch_size=Range(16, 256, integer=True, q=16))
+        bp.save(self.dir)
+        bp2 = BluePrint("test")
+        bp2.load(self.dir)
+        self.assertEqual(bp, bp2)
+        self.assertTrue(bp2.check("batch_size", 32))
+
     def tearDown(self):
         for name in os.listdir(self.dir):
             (self.dir / name).unlink()
@@ -120,5 +131,122 @@ class TestVariableAccess(unittest.TestCase):
     def test_check_list_class(self):
         self.assertTrue(self.bp.check("list", Dummy_Module.A))
 
+    def test_check_rejects_invalid_values(self):
+        self.assertFalse(self.bp.check("a", 0.5))
+        self.assertFalse(self.bp.check("list", Dummy_Module.C))
+        self.assertFalse(self.bp.check("list", [Dummy_Module.A])) # Unhashable
+
+    def test_check_unknown_key(self):
+        self.assertRaises(KeyError, self.bp.check, "BAD_KEY", 10)
+
+    def test_check_after_setitem_uses_new_constraint(self):
+        self.assertFalse(self.bp.check("list", Dummy_Module.C))
+        self.bp["list"] = [Dummy_Module.C]
+        self.assertTrue(self.bp.check("list", Dummy_Module.C))
+        self.assertFalse(self.bp.check("list", Dummy_Module.A))
+
+    def test_check_many(self):
+        configs = [{"a": 1, "list": Dummy_Module.A}, {"a": 1.0}, {"list": Dummy_Module.C}, {"BAD_KEY": 1}, {}]
+        self.assertEqual(self.bp.check_many(configs), [True, False, False, False, True])
+
+class TestModuleClasses(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        BluePrint.module_index_path = self.dir / "module_index.json"
+        BluePrintModule._module_index.clear()
+        patcher = mock.patch("builtins.input", side_effect=lambda *args: self.fail("Prompted for input"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_include_and_exclude_patterns(self):
+        bp = BluePrint("test", include="^[AB]$", module=Dummy_Module)
+        self.assertEqual(bp["module"], [Dummy_Module.A, Dummy_Module.B])
+        bp = BluePrint("test", exclude=["A", "B"], module=Dummy_Module)
+        self.assertEqual(bp["module"], [Dummy_Module.C])
+        self.assertEqual(bp.get_module_classes(Dummy_Module, include="B|C", exclude="C"), [Dummy_Module.B])
+
+    def test_index_is_reused_across_processes(self):
+        Stats.enable()
+        try:
+            BluePrint("test", include=".*", module=Dummy_Module)
+            with open(BluePrint.module_index_path) as f:
+                key, = json.load(f)
+            self.assertTrue(key.startswith(f"{Dummy_Module.__name__}=="))
+            BluePrintModule._module_index.clear() # As in a fresh process
+            BluePrint("test", include=".*", module=Dummy_Module)
+            counters = Stats.snapshot()["counters"]
+            self.assertEqual((counters["blueprint.module_index.misses"], counters["blueprint.module_index.hits"]), (1, 1))
+        finally:
+            Stats.disable()
+            Stats.reset()
+
+    def test_stale_index_is_rebuilt(self):
+        key = f"{Dummy_Module.__name__}=={BluePrintModule.module_version(Dummy_Module)}"
+        with open(BluePrint.module_index_path, "w") as f:
+            json.dump({key: [["A", ""], ["Removed", ""]]}, f)
+        bp = BluePrint("test", skip_prompts=True, module=Dummy_Module)
+        self.assertEqual(bp["module"], [Dummy_Module.A, Dummy_Module.B, Dummy_Module.C])
+
+    def test_concurrent_processes_merge_their_modules(self):
+        bp = BluePrint("test", skip_prompts=True, int=int)
+        modules = [json, argparse, logging, string]
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=bp._module_members, args=(module,)) for module in modules]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+        with open(BluePrint.module_index_path) as f:
+            self.assertEqual(sorted(key.split("==")[0] for key in json.load(f)), sorted(m.__name__ for m in modules))
+
+    def tearDown(self):
+        BluePrint.module_index_path = None
+        BluePrintModule._module_index.clear()
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+class TestRange(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=Range(1e-5, 1e-1, log=True),
+                            dropout=Range(0.0, 0.5), layers=Range(1, 8, integer=True), batch_size=Range(16, 256, integer=True, q=16))
+
+    def test_check_bounds_and_types(self):
+        self.assertTrue(self.bp.check("lr", 1e-3))
+        self.assertFalse(self.bp.check("lr", 1.0))
+        self.assertTrue(self.bp.check("dropout", 0))
+        self.assertFalse(self.bp.check("dropout", True))
+        self.assertFalse(self.bp.check("layers", 2.0))
+        self.assertFalse(self.bp.check("layers", 9))
+        self.assertTrue(self.bp.check("batch_size", 64))
+        self.assertFalse(self.bp.check("batch_size", 65))
+
+    def test_invalid_ranges(self):
+        self.assertRaises(ValueError, Range, 1, 0)
+        self.assertRaises(ValueError, Range, 0, 1, log=True)
+        self.assertRaises(ValueError, Range, 1, 2, q=5)
+
+    def test_samples_satisfy_range(self):
+        rng = random.Random(0)
+        for key in ["lr", "dropout", "layers", "batch_size"]:
+            samples = [self.bp[key].sample(rng) for _ in range(200)]
+            self.assertTrue(all(self.bp.check(key, v) for v in samples), key)
+        self.assertEqual(set(self.bp["layers"].sample(rng) for _ in range(500)), set(range(1, 9)))
+
+    def test_unit_interval_ends(self):
+        self.assertEqual(self.bp["layers"].from_unit(0.0), 1)
+        self.assertEqual(self.bp["layers"].from_unit(0.999999), 8)
+        self.assertAlmostEqual(self.bp["lr"].from_unit(0.5), 1e-3)
+
+    def test_equal_ranges_hash_equal(self):
+        self.assertEqual(hash(Range(16, 256, integer=True, q=16)), hash(self.bp["batch_size"]))
+        self.assertEqual(len({Range(0.0, 0.5), self.bp["dropout"], self.bp["layers"]}), 2)
+        self.assertIn(Range(1, 8, integer=True), frozenset([self.bp["layers"]]))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import unittest, os, shutil, time
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from Cache import memoize
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+class TestMemoize(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            batch_size=int, lr=float, list=[Dummy_Module.A, Dummy_Module.B])
+        self.dir = Path(__file__).parent / "TEMP"
+        self.calls = []
+
+    def make(self, **kwargs):
+        return HyperParameters("test", blueprint=self.bp, **kwargs)
+
+    def test_results_are_cached(self):
+        @memoize(self.dir)
+        def trial(hparams):
+            self.calls.append(hparams.id)
+            return hparams["batch_size"] * 2
+        self.assertEqual(trial(self.make(batch_size=4)), 8)
+        self.assertEqual(trial(self.make(batch_size=4)), 8)
+        self.assertEqual(trial(self.make(batch_size=5)), 10)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(trial.cache_info()[:3], (1, 2, 2))
+
+    def test_cache_is_shared_across_configs_with_same_keys(self):
+        @memoize(self.dir, keys=["batch_size"])
+        def preprocess(hparams):
+            self.calls.append(hparams.id)
+            return hparams["batch_size"]
+        preprocess(self.make(batch_size=4, lr=0.1))
+        preprocess(self.make(batch_size=4, lr=0.2, list=Dummy_Module.B))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_extra_arguments_are_part_of_key(self):
+        @memoize(self.dir)
+        def trial(hparams, fold):
+            self.calls.append(fold)
+            return fold
+        hparams = self.make(batch_size=4)
+        self.assertEqual([trial(hparams, 0), trial(hparams, 1), trial(hparams, 0)], [0, 1, 0])
+        self.assertEqual(self.calls, [0, 1])
+
+    def test_max_entries_eviction(self):
+        @memoize(self.dir, max_entries=2)
+        def trial(hparams):
+            return hparams["batch_size"]
+        for i in range(5):
+            trial(self.make(batch_size=i))
+        self.assertEqual(trial.cache_info().entries, 2)
+
+    def test_least_recently_used_is_evicted(self):
+        @memoize(self.dir, max_entries=2)
+        def trial(hparams):
+            self.calls.append(hparams["batch_size"])
+            return hparams["batch_size"]
+        trial(self.make(batch_size=0))
+        trial(self.make(batch_size=1))
+        for entry in os.scandir(next(self.dir.iterdir())): # Computed a while ago
+            os.utime(entry.path, (time.time() - 100, time.time() - 100))
+        trial(self.make(batch_size=0)) # Hit, 0 is now the most recently used
+        trial(self.make(batch_size=2)) # Evicts 1, the least recently used
+        trial(self.make(batch_size=0))
+        trial(self.make(batch_size=1))
+        self.assertEqual(self.calls, [0, 1, 2, 1])
+
+    def test_max_age_eviction(self):
+        @memoize(self.dir, max_age=60)
+        def trial(hparams):
+            self.calls.append(hparams.id)
+            return hparams["batch_size"]
+        hparams = self.make(batch_size=4)
+        trial(hparams)
+        for entry in os.scandir(next(self.dir.iterdir())):
+            os.utime(entry.path, (time.time() - 120, time.time() - 120))
+        trial(hparams)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_cache_clear(self):
+        @memoize(self.dir)
+        def trial(hparams):
+            return 1
+        trial(self.make(batch_size=1))
+        trial.cache_clear()
+        self.assertEqual(trial.cache_info(), (0, 0, 0, 0))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest, shutil, importlib.util
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy not installed")
+class TestColumnarExport(unittest.TestCase):
+
+    def setUp(self):
+        from Columnar import export_columns, open_columns
+        self.export_columns, self.open_columns = export_columns, open_columns
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            batch_size=int, lr=float, name=str, flag=bool, list=[Dummy_Module.A, Dummy_Module.B])
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, batch_size=2 ** i, lr=0.1 * i, name=f"run{i % 2}", flag=i > 3,
+                                        list=Dummy_Module.A if i % 2 else Dummy_Module.B) for i in range(8)]
+        self.configs.append(HyperParameters("test_8", blueprint=self.bp, lr=0.8)) # Missing values
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.results = {f"test_{i}": {"loss": 1.0 / (i + 1), "epochs": i} for i in range(8)}
+        self.assertEqual(self.export_columns(self.configs, self.dir / "columns", self.results), 9)
+        self.table = self.open_columns(self.dir / "columns")
+
+    def test_columns_are_memory_mapped(self):
+        import numpy as np
+        self.assertEqual(len(self.table), 9)
+        self.assertIsInstance(self.table["lr"], np.memmap)
+        self.assertEqual(self.table.ids.tolist(), [f"test_{i}" for i in range(9)])
+        self.assertEqual(sorted(self.table.keys()), ["batch_size", "epochs", "flag", "list", "loss", "lr", "name"])
+
+    def test_classes_are_dictionary_encoded(self):
+        self.assertEqual(self.table.kind("list"), "class")
+        self.assertEqual(self.table["list"].dtype.kind, "i")
+        self.assertEqual(self.table.equals("list", Dummy_Module.A).sum(), 4)
+        self.assertEqual(self.table.equals("list", Dummy_Module.C).sum(), 0)
+        self.assertEqual(self.table.equals("name", "run1").sum(), 4)
+        self.assertEqual(self.table.decode("list", lazy=False)[:3].tolist(), [Dummy_Module.B, Dummy_Module.A, Dummy_Module.B])
+
+    def test_vectorized_filter_with_metrics(self):
+        mask = self.table.equals("list", Dummy_Module.B) & (self.table["loss"] < 0.3)
+        self.assertEqual(self.table.ids[mask].tolist(), ["test_4", "test_6"])
+        self.assertEqual(self.table.metrics, ["epochs", "loss"])
+
+    def test_missing_values_round_trip(self):
+        self.assertEqual(self.table.kind("batch_size"), "int")
+        self.assertEqual(self.table.decode("batch_size")[-2:].tolist(), [128, None])
+        rebuilt = list(self.table.to_hyperparameters(self.bp, lazy=False))
+        self.assertEqual(rebuilt, self.configs)
+        self.assertEqual([h.id for h in rebuilt], [h.id for h in self.configs])
+        self.assertIs(type(rebuilt[3]["batch_size"]), int)
+
+    def test_clashing_metric(self):
+        self.assertRaises(ValueError, self.export_columns, self.configs, self.dir / "clash", {"test_0": {"lr": 0.5}})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
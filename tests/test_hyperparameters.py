@@ -1,10 +1,25 @@
-import unittest, types, os
+import unittest, types, os, sys, pickle, json, asyncio, subprocess, shutil
 
 from BluePrint import BluePrint
-from HyperParameters import HyperParameters
+from HyperParameters import HyperParameters, HyperParametersEncoder, fingerprint
+import Utils
+from Utils import LazyClass, resolve_class
 from tests import Dummy_Module as Dummy_Module
 from pathlib import Path
 
+class Optimizer:
+    def __init__(self, params=None, lr=0.1, momentum=0.0):
+        self.params, self.lr, self.momentum = params, lr, momentum
+
+class Scheduler:
+    def __init__(self, optimizer, gamma=0.5):
+        self.optimizer, self.gamma = optimizer, gamma
+
+class Trainer:
+    def __init__(self, model, optimizer=None, scheduler=None):
+        self.optimizer = optimizer(model)
+        self.scheduler = scheduler(self.optimizer)
+
 class TestConstraintsWhenAddingNewItemsToHyperparameters(unittest.TestCase):
 
     def setUp(self):
@@ -35,7 +50,7 @@ class TestConstraintsWhenAddingNewItemsToHyperparameters(unittest.TestCase):
     def test_add_value_that_is_module_class(self):
         self.hparams["module"] = Dummy_Module.A
         self.assertIn("module", self.hparams)
-        self.assertEqual(self.hparams["module"],  Dummy_Module.A)
+        self.assertEqual(self.hparams["module"],  (Dummy_Module.A, {}))
 
     def test_add_invalid_float_to_int(self):
         self.assertRaises(ValueError, self.hparams.__setitem__, "int", 0.5)
@@ -80,11 +95,158 @@ class TestSaveAndReload(unittest.TestCase):
         hparams2.load(self.dir)
         self.assertEqual(hparams, hparams2)
 
+    def test_reload_with_lazy_classes(self):
+        hparams = HyperParameters("test", blueprint=self.bp, int=0, module=Dummy_Module.C)
+        hparams.save(self.dir)
+        hparams2 = HyperParameters("test", blueprint=self.bp).load(self.dir, lazy=True)
+        self.assertEqual(hparams2["int"], 0)
+        self.assertIs(resolve_class(hparams2.to_dict()["module"]), Dummy_Module.C)
+        self.assertEqual(hparams, hparams2)
+
+    def test_lazy_classes_are_resolved_on_access(self):
+        HyperParameters("test", blueprint=self.bp, module=Dummy_Module.C, list=Dummy_Module.B).save(self.dir)
+        for name in ["tests.Dummy_Module.B", "tests.Dummy_Module.C"]:
+            Utils._classes.pop(name, None) # Resolved by earlier tests, which would make them load eagerly
+        hparams = HyperParameters("test", blueprint=self.bp).load(self.dir, lazy=True)
+        lazy = hparams.to_dict()["list"]
+        self.assertIsInstance(lazy, LazyClass)
+        self.assertTrue(self.bp.check("list", lazy))
+        self.assertEqual(self.bp.check_many([{"list": lazy, "module": LazyClass("tests.Dummy_Module.A")}]), [True])
+        self.assertEqual(hparams["list"], (Dummy_Module.B, {}))
+        self.assertEqual(hparams.get("module"), (Dummy_Module.C, {}))
+        self.assertEqual(hparams.fetch_class_hyperparameters(lazy), {})
+        hparams["list"] = lazy # Passes the BluePrint's constraint, like the class itself
+        self.assertEqual(hparams["list"], (Dummy_Module.B, {}))
+        self.assertRaises(ValueError, hparams.__setitem__, "list", LazyClass("tests.Dummy_Module.C"))
+
+    def test_async_save_and_load(self):
+        hparams = HyperParameters("test", blueprint=self.bp, int=3, list=Dummy_Module.B)
+        async def round_trip():
+            await asyncio.gather(hparams.asave(self.dir), self.bp.asave(self.dir))
+            bp2 = await BluePrint("test").aload(self.dir)
+            return bp2, await HyperParameters("test", blueprint=bp2).aload(self.dir)
+        bp2, hparams2 = asyncio.run(round_trip())
+        self.assertEqual(self.bp, bp2)
+        self.assertEqual(hparams, hparams2)
+
+    def tearDown(self):
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+class TestIncrementalSave(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            int=int, str=str, list=[Dummy_Module.A, Dummy_Module.B])
+        self.hparams = HyperParameters("test", blueprint=self.bp, int=1, str="hello", list=Dummy_Module.A)
+        self.dir = Path(__file__).parent  / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.file_path = self.dir / "HyperParameters_test.json"
+
+    def test_save_skipped_when_clean(self):
+        self.hparams.save(self.dir)
+        mtime = self.file_path.stat().st_mtime_ns
+        os.utime(self.file_path, ns=(mtime - 10**9, mtime - 10**9))
+        self.hparams.save(self.dir)
+        self.assertEqual(self.file_path.stat().st_mtime_ns, mtime - 10**9)
+        self.hparams["int"] = 2
+        self.hparams.save(self.dir)
+        self.assertNotEqual(self.file_path.stat().st_mtime_ns, mtime - 10**9)
+        self.assertEqual(HyperParameters("test", blueprint=self.bp).load(self.dir)["int"], 2)
+
+    def test_save_after_load_is_skipped(self):
+        self.hparams.save(self.dir)
+        hparams = HyperParameters("test", blueprint=self.bp).load(self.dir)
+        self.file_path.unlink()
+        hparams.save(self.dir) # File is gone, so it is written even though nothing changed
+        self.assertTrue(self.file_path.exists())
+
+    def test_atomic_save_leaves_no_temporary_files(self):
+        self.hparams.save(self.dir, fsync=True)
+        self.hparams.save(self.dir, force=True)
+        self.assertEqual(os.listdir(self.dir), ["HyperParameters_test.json"])
+
+    def test_changelog(self):
+        self.hparams.save(self.dir)
+        self.hparams["int"] = 2
+        self.hparams.save(self.dir, changelog=True)
+        self.hparams["list"] = Dummy_Module.B
+        self.hparams.save(self.dir, changelog=True)
+        changelog_path = self.dir / "HyperParameters_test.changes.jsonl"
+        with open(changelog_path) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(HyperParameters("test", blueprint=self.bp).load(self.dir), self.hparams)
+        self.hparams["str"] = "bye"
+        self.hparams.save(self.dir) # Compacts the changelog
+        self.assertFalse(changelog_path.exists())
+        self.assertEqual(HyperParameters("test", blueprint=self.bp).load(self.dir), self.hparams)
+
+    def test_stale_changelog_is_ignored(self):
+        self.hparams.save(self.dir)
+        self.hparams["int"] = 2
+        self.hparams.save(self.dir, changelog=True)
+        changelog_path = self.dir / "HyperParameters_test.changes.jsonl"
+        stale = changelog_path.read_bytes()
+        self.hparams["int"] = 3
+        self.hparams.save(self.dir)
+        changelog_path.write_bytes(stale) # As if the process crashed before the compacted log was removed
+        self.assertEqual(HyperParameters("test", blueprint=self.bp).load(self.dir)["int"], 3)
+        self.hparams["str"] = "bye"
+        self.hparams.save(self.dir, changelog=True) # Appended after the stale change
+        loaded = HyperParameters("test", blueprint=self.bp).load(self.dir)
+        self.assertEqual((loaded["int"], loaded["str"]), (3, "bye"))
+
     def tearDown(self):
         for name in os.listdir(self.dir):
             (self.dir / name).unlink()
         self.dir.rmdir()
 
+class TestBulkSaveAndReload(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            int=int, str=str, list=[Dummy_Module.A, Dummy_Module.B])
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, int=i, str=f"run{i}", list=Dummy_Module.B) for i in range(10)]
+        self.dir = Path(__file__).parent  / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+
+    def test_json_lines_round_trip(self):
+        self.assertEqual(HyperParameters.save_many(iter(self.configs), self.dir / "test.jsonl"), 10)
+        loaded = list(HyperParameters.load_many(self.dir / "test.jsonl", self.bp))
+        self.assertEqual([h.id for h in loaded], [h.id for h in self.configs])
+        self.assertEqual(loaded, self.configs)
+
+    def test_directory_round_trip(self):
+        HyperParameters.save_all(self.configs, self.dir, max_workers=4)
+        self.assertEqual(sorted(HyperParameters.saved_ids(self.dir)), sorted(h.id for h in self.configs))
+        loaded = list(HyperParameters.load_all(self.bp, [h.id for h in self.configs], self.dir, max_workers=4))
+        self.assertEqual([h.id for h in loaded], [h.id for h in self.configs])
+        self.assertEqual(loaded, self.configs)
+
+    def test_default_directory_in_fresh_process(self):
+        (self.dir / "HyperParameters").mkdir()
+        HyperParameters.save_all(self.configs[:2], self.dir / "HyperParameters")
+        code = (f"import sys; sys.path.insert(0, {str(Path(__file__).parent.parent)!r}); from BluePrint import BluePrint; from HyperParameters import HyperParameters; "
+                "print(HyperParameters.saved_ids()); bp = BluePrint('test', skip_prompts=True, int=int, str=str, list=list); print([h.id for h in HyperParameters.load_all(bp, lazy=True)])")
+        output = subprocess.run([sys.executable, "-c", code], cwd=self.dir, capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.split("\n")[-3:-1], ["['test_0', 'test_1']"] * 2)
+
+    def test_directory_reads_ahead_boundedly(self):
+        HyperParameters.save_all(iter(self.configs), self.dir, max_workers=2, max_in_flight=3)
+        taken = []
+        def ids():
+            for h in self.configs:
+                taken.append(h.id)
+                yield h.id
+        loaded = HyperParameters.load_all(self.bp, ids(), self.dir, max_workers=2, max_in_flight=3)
+        self.assertEqual(next(loaded), self.configs[0])
+        self.assertLessEqual(len(taken), 4) # Three in flight, plus the one waiting for a free slot
+        self.assertEqual([h.id for h in loaded], [h.id for h in self.configs[1:]])
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
 class TestVariableAccess(unittest.TestCase):
     def setUp(self):
         bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
@@ -132,6 +294,174 @@ class TestVariableAccess(unittest.TestCase):
     def test_get_returns_None_if_no_default_provided_and_nonexisting_key(self):
         self.assertEqual(self.hparams.get("OTHER_BAD_KEY"), None)
 
+class TestClassHyperParameterCache(unittest.TestCase):
+    def setUp(self):
+        bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=float, list=[Dummy_Module.A, Dummy_Module.B])
+        self.hparams = HyperParameters("test", blueprint=bp, lr=0.5)
+        self.hparams["optimizer"] = Optimizer
+
+    def test_class_defaults_use_hyperparameters(self):
+        self.assertEqual(self.hparams["optimizer"], (Optimizer, {"params": None, "lr": 0.5, "momentum": 0.0}))
+
+    def test_cached_kwargs_invalidated_by_setitem(self):
+        self.hparams["optimizer"]
+        self.hparams["lr"] = 0.01
+        self.hparams["momentum"] = 0.9
+        self.assertEqual(self.hparams["optimizer"][1], {"params": None, "lr": 0.01, "momentum": 0.9})
+
+    def test_modifying_returned_kwargs_does_not_modify_cache(self):
+        _, kwargs = self.hparams["optimizer"]
+        kwargs["lr"] = 100
+        self.assertEqual(self.hparams.get("optimizer")[1]["lr"], 0.5)
+
+class TestFactory(unittest.TestCase):
+    def setUp(self):
+        bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=float, gamma=float)
+        self.hparams = HyperParameters("test", blueprint=bp, lr=0.5, gamma=0.1)
+        self.hparams["optimizer"], self.hparams["scheduler"], self.hparams["trainer"] = Optimizer, Scheduler, Trainer
+
+    def test_instantiate_binds_hyperparameters(self):
+        optimizer = self.hparams.instantiate("optimizer", "weights", momentum=0.9)
+        self.assertEqual((optimizer.params, optimizer.lr, optimizer.momentum), ("weights", 0.5, 0.9))
+
+    def test_factory_is_cached_until_change(self):
+        factory = self.hparams.factory("optimizer")
+        self.assertIs(self.hparams.factory("optimizer"), factory)
+        self.hparams["lr"] = 0.01
+        self.assertIsNot(self.hparams.factory("optimizer"), factory)
+        self.assertEqual(self.hparams.instantiate("optimizer").lr, 0.01)
+
+    def test_nested_classes_are_passed_as_factories(self):
+        trainer = self.hparams.instantiate("trainer", "weights")
+        self.assertEqual((trainer.optimizer.params, trainer.optimizer.lr), ("weights", 0.5))
+        self.assertIs(trainer.scheduler.optimizer, trainer.optimizer)
+        self.assertEqual(trainer.scheduler.gamma, 0.1)
+
+    def test_non_class_and_missing_keys(self):
+        self.assertRaises(TypeError, self.hparams.factory, "lr")
+        self.assertRaises(KeyError, self.hparams.factory, "BAD_KEY")
+
+class TestOverlay(unittest.TestCase):
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=float, momentum=float, int=int)
+        self.base = HyperParameters("base", blueprint=self.bp, lr=0.5, momentum=0.9, int=1)
+        self.base["optimizer"] = Optimizer
+        self.overlay = HyperParameters("trial", base=self.base, lr=0.01)
+        self.dir = Path(__file__).parent  / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+
+    def test_values_resolve_through_base(self):
+        self.assertEqual(vars(self.overlay).get("momentum"), None) # Not copied
+        self.assertEqual((self.overlay["lr"], self.overlay["momentum"]), (0.01, 0.9))
+        self.assertIn("int", self.overlay)
+        self.assertEqual(self.overlay.to_dict(), {"lr": 0.01, "momentum": 0.9, "int": 1, "optimizer": Optimizer})
+        self.assertIs(self.overlay.blueprint, self.bp)
+        self.assertIs(self.overlay.logger, self.base.logger)
+
+    def test_base_changes_are_seen_by_overlay(self):
+        self.assertEqual(self.overlay["optimizer"][1]["momentum"], 0.9)
+        self.assertEqual(self.overlay.instantiate("optimizer").momentum, 0.9)
+        self.base["momentum"], self.base["lr"] = 0.5, 1.0
+        self.assertEqual(self.overlay["optimizer"][1], {"params": None, "lr": 0.01, "momentum": 0.5})
+        self.assertEqual(self.overlay.instantiate("optimizer").momentum, 0.5)
+
+    def test_equal_to_full_copy(self):
+        copy = HyperParameters("copy", blueprint=self.bp, lr=0.01, momentum=0.9, int=1)
+        copy["optimizer"] = Optimizer
+        self.assertEqual(self.overlay, copy)
+        self.assertEqual(self.overlay.fingerprint(), copy.fingerprint())
+
+    def test_delta_save_and_reload(self):
+        self.overlay.save(self.dir, delta=True)
+        with open(self.dir / "HyperParameters_trial.json") as f:
+            saved = json.load(f)
+        self.assertEqual((saved["__base__"], saved["__primitives__"], saved["__classes__"]), ("base", [["lr", 0.01]], []))
+        self.assertTrue((self.dir / "HyperParameters_base.json").exists())
+        HyperParameters("other", base=self.base, int=2).save(self.dir, delta=True)
+        loaded = list(HyperParameters.load_all(self.bp, ["trial", "other"], self.dir))
+        self.assertEqual(loaded[0], self.overlay)
+        self.assertEqual(loaded[1]["int"], 2)
+        self.assertIs(loaded[0]._base, loaded[1]._base) # Base is loaded once
+
+    def test_full_save_of_overlay_includes_base_changes(self):
+        self.overlay.save(self.dir)
+        self.base["int"] = 5
+        self.overlay.save(self.dir)
+        self.assertEqual(HyperParameters("trial", blueprint=self.bp).load(self.dir)["int"], 5)
+
+    def test_changelog_save_of_overlay_includes_base_changes(self):
+        self.overlay.save(self.dir)
+        self.base["int"] = 5
+        self.overlay.save(self.dir, changelog=True)
+        self.assertEqual(HyperParameters("trial", blueprint=self.bp).load(self.dir)["int"], 5)
+
+    def test_blueprint_or_base_required(self):
+        self.assertRaises(TypeError, HyperParameters, "test")
+
+    def tearDown(self):
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+class TestFrozenHyperParameters(unittest.TestCase):
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            int=int, str=str, list=[Dummy_Module.A, Dummy_Module.B])
+        self.hparams = HyperParameters("test", blueprint=self.bp, int=10, str="hello", list=Dummy_Module.A)
+
+    def test_freeze_snapshot(self):
+        frozen = self.hparams.freeze()
+        self.hparams["int"] = 20
+        self.assertEqual(frozen["int"], 10)
+        self.assertEqual(frozen.get("list"), Dummy_Module.A)
+        self.assertEqual(frozen.get("BAD_KEY", 42), 42)
+        self.assertRaises(KeyError, frozen.__getitem__, "BAD_KEY")
+        self.assertEqual(list(frozen), ["int", "list", "str"])
+
+    def test_frozen_is_immutable(self):
+        frozen = self.hparams.freeze()
+        self.assertRaises(AttributeError, setattr, frozen, "id", "other")
+        self.assertRaises(AttributeError, setattr, frozen, "new", 1)
+
+    def test_equality_and_hash_ignore_id(self):
+        other = HyperParameters("other", blueprint=self.bp, list=Dummy_Module.A, str="hello", int=10)
+        self.assertEqual(self.hparams.freeze(), other.freeze())
+        self.assertEqual(len({self.hparams.freeze(), other.freeze()}), 1)
+        other["int"] = 11
+        self.assertNotEqual(self.hparams.freeze(), other.freeze())
+
+    def test_thaw(self):
+        self.assertEqual(self.hparams.freeze().thaw(self.bp), self.hparams)
+
+    def test_pickle(self):
+        frozen = self.hparams.freeze()
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)), frozen)
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            int=int, float=float, list=[Dummy_Module.A, Dummy_Module.B])
+        self.hparams = HyperParameters("test", blueprint=self.bp, int=10, float=0.5, list=Dummy_Module.A)
+
+    def test_fingerprint_ignores_id_and_order(self):
+        other = HyperParameters("other", blueprint=self.bp, list=Dummy_Module.A, float=0.5, int=10)
+        self.assertEqual(self.hparams.fingerprint(), other.fingerprint())
+        other["list"] = Dummy_Module.B
+        self.assertNotEqual(self.hparams.fingerprint(), other.fingerprint())
+
+    def test_fingerprint_distinguishes_types(self):
+        other = HyperParameters("other", blueprint=self.bp, int=10, float=0.5, list=Dummy_Module.A)
+        self.hparams["extra"], other["extra"] = 1, 1.0 # Not in BluePrint, so not type checked
+        self.assertNotEqual(self.hparams.fingerprint(), other.fingerprint())
+
+    def test_fingerprint_subset_of_keys(self):
+        other = HyperParameters("other", blueprint=self.bp, int=10, float=0.1, list=Dummy_Module.A)
+        self.assertEqual(self.hparams.fingerprint(keys=["int", "list"]), other.fingerprint(keys=["int", "list"]))
+        self.assertNotEqual(self.hparams.fingerprint(), other.fingerprint())
+
+    def test_fingerprint_matches_saved_file(self):
+        self.assertEqual(self.hparams.fingerprint(), fingerprint(json.loads(json.dumps(self.hparams, cls=HyperParametersEncoder))))
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,70 @@
+import unittest, subprocess, sys, json, tempfile
+
+from pathlib import Path
+
+HEAVY_MODULES = ["torch", "numpy"]
+MODULES = ["BluePrint", "HyperParameters", "Sweep", "Runner", "Store", "Columnar", "Watcher", "Serialization", "WorkQueue"]
+IMPORT_BUDGET = 1.0 # Seconds, generous so the check is not flaky on slow machines
+
+def measure_import(modules):
+    """Imports 'modules' in a fresh interpreter, returning the import time and the heavy modules that got imported."""
+    code = f"""
+import sys, time, json
+sys.path.insert(0, {str(Path(__file__).parent.parent)!r})
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+print(json.dumps({{"seconds": time.perf_counter() - start, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+    return json.loads(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout)
+
+def run_with_package(code):
+    """Runs 'code' in a fresh interpreter (and a temporary working directory) with the package imported as 'pkg', returning its output."""
+    package = Path(__file__).parent.parent
+    code = f"import sys; sys.path.insert(0, {str(package.parent)!r}); import {package.name} as pkg\n" + code
+    with tempfile.TemporaryDirectory() as tmp:
+        return subprocess.run([sys.executable, "-c", code], cwd=tmp, capture_output=True, text=True, check=True).stdout
+
+class TestPackage(unittest.TestCase):
+
+    def test_package_shares_the_library_modules(self):
+        output = run_with_package("""
+import Sweep
+print(pkg.Range is Sweep.Range, sys.modules[pkg.__name__ + ".BluePrint"] is sys.modules["BluePrint"])
+bp = pkg.BluePrint("test", skip_prompts=True, lr=pkg.Range(0.1, 1.0), layers=pkg.Range(1, 4, integer=True))
+print(sorted(next(iter(pkg.random_search(bp, 1))).to_dict()))
+""")
+        self.assertEqual(output.split("\n")[:2], ["True True", "['layers', 'lr']"])
+
+    def test_package_serializes_its_classes(self):
+        output = run_with_package("""
+bp = pkg.BluePrint("test", skip_prompts=True, int=int)
+hparams = pkg.HyperParameters("test", blueprint=bp, int=3)
+for format in ["json", "binary"]:
+    print(pkg.loads(pkg.dumps(bp, format)).constraints() == bp.constraints(), pkg.loads(pkg.dumps(hparams, format), blueprint=bp) == hparams)
+""")
+        self.assertEqual(output.split("\n")[:2], ["True True"] * 2)
+
+    def test_package_shares_stats_and_log(self):
+        output = run_with_package("""
+import importlib
+stats = importlib.import_module(pkg.__name__ + ".Stats")
+stats.enable()
+pkg.BluePrint("test", skip_prompts=True, int=int).check("int", 1)
+print(stats is pkg.Stats, importlib.import_module(pkg.__name__ + ".log") is pkg.log, len(stats.snapshot()["counters"]) > 0)
+print(sorted(name for name in ["os", "time", "tempfile", "importlib", "builtins", "fcntl", "contextmanager"] if hasattr(pkg, name)))
+""")
+        self.assertEqual(output.split("\n")[:2], ["True True True", "[]"])
+
+class TestImportTime(unittest.TestCase):
+
+    def test_heavy_modules_are_not_imported(self):
+        self.assertEqual(measure_import(MODULES)["heavy"], [])
+
+    def test_import_time(self):
+        seconds = min(measure_import(MODULES)["seconds"] for _ in range(3))
+        self.assertLess(seconds, IMPORT_BUDGET)
+
+
+if __name__ == '__main__':
+    unittest.main()
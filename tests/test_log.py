@@ -0,0 +1,95 @@
+import unittest, os, logging, multiprocessing
+
+import log
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from log import setup_basic_logger, set_instance_logging
+from pathlib import Path
+
+def log_in_child(dir):
+    setup_basic_logger(dir, logging.INFO, "test_fork.log").info("Child")
+    log.flush()
+
+class TestSetupBasicLogger(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+
+    def test_one_handler_per_file(self):
+        for _ in range(10):
+            logger = setup_basic_logger(self.dir, logging.INFO, "test_handlers.log")
+        self.assertEqual(len(logger.handlers), 1)
+        for _ in range(10):
+            bp = BluePrint("test_handlers", custom_dir=None, skip_prompts=True, int=int)
+        self.assertEqual(len(bp.logger.handlers), 1)
+
+    def test_records_are_written_once(self):
+        for _ in range(3):
+            logger = setup_basic_logger(self.dir, logging.INFO, "test_records.log")
+        logger.info("Hello")
+        logger.debug("Not written")
+        log.flush()
+        with open(self.dir / "logs" / "test_records.log") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].startswith("INFO") and lines[0].strip().endswith("Hello"))
+
+    def test_open_files_are_capped(self):
+        max_open, log._router.max_open = log._router.max_open, 2
+        try:
+            loggers = [setup_basic_logger(self.dir, logging.INFO, f"test_capped_{i}.log") for i in range(5)]
+            for round in range(2):
+                for i, logger in enumerate(loggers):
+                    logger.info(f"Round {round} of {i}")
+            self.assertTrue(log.flush(10))
+            self.assertLessEqual(len(log._router.files), 2)
+        finally:
+            log._router.max_open = max_open
+        for i in range(5):
+            with open(self.dir / "logs" / f"test_capped_{i}.log") as f:
+                self.assertEqual([line.strip().split(" ", 3)[-1] for line in f], [f"Round 0 of {i}", f"Round 1 of {i}"])
+
+    def test_forked_child_logs(self):
+        logger = setup_basic_logger(self.dir, logging.INFO, "test_fork.log")
+        logger.info("Parent")
+        process = multiprocessing.get_context("fork").Process(target=log_in_child, args=(self.dir,))
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+        log.flush()
+        with open(self.dir / "logs" / "test_fork.log") as f:
+            self.assertEqual(sorted(line.strip().split(" ", 3)[-1] for line in f), ["Child", "Parent"])
+
+    def test_overwrite(self):
+        (self.dir / "logs").mkdir()
+        with open(self.dir / "logs" / "test_overwrite.log", "w") as f:
+            f.write("Old\n")
+        setup_basic_logger(self.dir, logging.INFO, "test_overwrite.log", overwrite=True).info("New")
+        log.flush()
+        with open(self.dir / "logs" / "test_overwrite.log") as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].strip().endswith("New"))
+
+    def test_disable_instance_logging(self):
+        set_instance_logging(False)
+        try:
+            bp = BluePrint("test_disabled", custom_dir=None, skip_prompts=True, int=int)
+            hparams = HyperParameters("test_disabled", blueprint=bp, int=1)
+        finally:
+            set_instance_logging(True)
+        self.assertTrue(bp.logger.disabled and hparams.logger.disabled)
+        self.assertEqual(hparams["int"], 1)
+
+    def tearDown(self):
+        log.close() # Close the files before removing them
+        if (self.dir / "logs").exists():
+            for name in os.listdir(self.dir / "logs"):
+                (self.dir / "logs" / name).unlink()
+            (self.dir / "logs").rmdir()
+        self.dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest, os, json, asyncio, threading
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from Runner import run_trials, arun_trials, to_payload, from_payload
+from Store import FingerprintIndex
+from Sweep import grid_search
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+def square(hparams):
+    return hparams["int"] ** 2
+
+def fail_on_three(hparams):
+    if hparams["int"] == 3:
+        raise ValueError("Bad trial")
+    return hparams["int"]
+
+def class_name(hparams):
+    return hparams["list"][0].__name__
+
+def crash_on_three(hparams):
+    if hparams["int"] == 3:
+        os._exit(1)
+    return hparams["int"]
+
+class TestRunTrials(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            int=int, list=[Dummy_Module.A, Dummy_Module.B])
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, int=i, list=Dummy_Module.B) for i in range(8)]
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+
+    def test_payload_round_trip(self):
+        hparams = from_payload(to_payload(self.configs[2]))
+        self.assertEqual(hparams, self.configs[2])
+        self.assertEqual(hparams.id, "test_2")
+        self.assertEqual(hparams["list"], (Dummy_Module.B, {}))
+
+    def test_results_are_recorded_by_id(self):
+        results = {r.id: r for r in run_trials(square, self.configs, max_workers=2, max_in_flight=3)}
+        self.assertEqual({id: r.result for id, r in results.items()}, {f"test_{i}": i ** 2 for i in range(8)})
+        self.assertTrue(all(r.error is None for r in results.values()))
+
+    def test_configs_are_consumed_lazily(self):
+        results = list(run_trials(square, grid_search(self.bp, int=2), max_workers=2))
+        self.assertEqual(sorted(r.id for r in results), ["grid_0", "grid_1"])
+
+    def test_trial_exception_does_not_stop_sweep(self):
+        results = {r.id: r for r in run_trials(fail_on_three, self.configs, max_workers=2)}
+        self.assertEqual(len(results), 8)
+        self.assertIn("Bad trial", results["test_3"].error)
+        self.assertEqual(results["test_4"].result, 4)
+
+    def test_worker_crash_does_not_stop_sweep(self):
+        path = self.dir / "results.jsonl"
+        results = {r.id: r for r in run_trials(crash_on_three, self.configs, max_workers=2, results_path=path)}
+        self.assertEqual(len(results), 8)
+        self.assertIsNotNone(results["test_3"].error)
+        self.assertEqual({id: r.result for id, r in results.items() if id != "test_3"}, {f"test_{i}": i for i in range(8) if i != 3})
+        with open(path) as f:
+            self.assertEqual(len([json.loads(line) for line in f]), 8)
+
+    def test_lazily_loaded_configs(self):
+        HyperParameters.save_all(self.configs[:4], self.dir)
+        configs = HyperParameters.load_all(self.bp, [h.id for h in self.configs[:4]], self.dir, lazy=True)
+        results = list(run_trials(class_name, configs, max_workers=2))
+        self.assertEqual([r.error for r in results], [None] * 4)
+        self.assertEqual({r.result for r in results}, {"B"})
+
+    def test_index_skips_configs_that_already_ran(self):
+        index = FingerprintIndex(self.dir / "index")
+        self.assertEqual(len(list(run_trials(fail_on_three, self.configs[:5], max_workers=2, index=index))), 5)
+        self.assertEqual(len(index), 4) # Failed trial is not recorded
+        rerun = [r.id for r in run_trials(square, self.configs, max_workers=2, index=index)]
+        self.assertEqual(sorted(rerun), ["test_3", "test_5", "test_6", "test_7"])
+
+    def test_index_tells_configs_sharing_an_id_apart(self):
+        index = FingerprintIndex(self.dir / "index")
+        configs = [HyperParameters("same", blueprint=self.bp, int=i, list=Dummy_Module.B) for i in range(4)]
+        self.assertEqual(sorted(r.result for r in run_trials(square, configs, max_workers=2, index=index)), [0, 1, 4, 9])
+        self.assertEqual(len(index), 4)
+        self.assertEqual(list(run_trials(square, configs + self.configs[:2], max_workers=2, index=index)), [])
+
+    def tearDown(self):
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+class TestAsyncRunTrials(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int)
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, int=i) for i in range(8)]
+        self.running = self.peak = 0
+
+    async def sleepy_square(self, hparams):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.running -= 1
+        return fail_on_three(hparams) ** 2
+
+    async def test_concurrency_is_limited(self):
+        results = {r.id: r async for r in arun_trials(self.sleepy_square, self.configs, max_concurrency=3)}
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.peak, 3)
+        self.assertIn("Bad trial", results["test_3"].error)
+        self.assertEqual(results["test_4"].result, 16)
+
+    async def test_sync_trials_and_async_configs(self):
+        async def configs():
+            for hparams in self.configs:
+                yield hparams
+        results = {r.id: r.result async for r in arun_trials(square, configs(), max_concurrency=2)}
+        self.assertEqual(results, {f"test_{i}": i ** 2 for i in range(8)})
+
+    async def test_closing_early_cancels_running_trials(self):
+        results = arun_trials(self.sleepy_square, self.configs, max_concurrency=4)
+        await anext(results)
+        await results.aclose()
+        self.assertEqual(self.running, 0)
+
+    async def test_sync_configs_and_results_file_do_not_block_the_loop(self):
+        threads = []
+        def configs():
+            for hparams in self.configs:
+                threads.append(threading.current_thread())
+                yield hparams
+        dir = Path(__file__).parent / "TEMP"
+        dir.mkdir(exist_ok=True)
+        try:
+            results = [r async for r in arun_trials(self.sleepy_square, configs(), max_concurrency=2, results_path=dir / "results.jsonl")]
+            self.assertNotIn(threading.current_thread(), threads)
+            with open(dir / "results.jsonl") as f:
+                self.assertEqual([json.loads(line)["id"] for line in f], [r.id for r in results])
+        finally:
+            (dir / "results.jsonl").unlink()
+            dir.rmdir()
+
+    async def test_index_tells_configs_sharing_an_id_apart(self):
+        dir = Path(__file__).parent / "TEMP"
+        dir.mkdir(exist_ok=True)
+        try:
+            index = FingerprintIndex(dir / "index")
+            configs = [HyperParameters("same", blueprint=self.bp, int=i) for i in (0, 1, 2, 1)] # Last one is a copy
+            self.assertEqual(sorted([r.result async for r in arun_trials(square, configs, max_concurrency=4, index=index)]), [0, 1, 4])
+            self.assertEqual([r async for r in arun_trials(square, configs, index=index)], [])
+        finally:
+            (dir / "index").unlink()
+            dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
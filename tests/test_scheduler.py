@@ -0,0 +1,92 @@
+import unittest, sys, shutil, json, subprocess
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from Scheduler import SuccessiveHalving, hyperband
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+CLASSES = [Dummy_Module.A, Dummy_Module.B, Dummy_Module.C]
+
+class TestSuccessiveHalving(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            a=CLASSES, b=CLASSES, c=CLASSES)
+        self.dir = Path(__file__).parent / "TEMP"
+        self.calls = []
+
+    def trial(self, hparams, budget):
+        """Lower is better, C is best for every key, more budget lowers the loss."""
+        self.calls.append((hparams.id, budget))
+        return sum(CLASSES.index(hparams[k][0]) for k in ["a", "b", "c"]) * -1 + 1 / budget
+
+    def test_budgets(self):
+        self.assertEqual(SuccessiveHalving(self.bp, self.trial, 27, 1, 9).budgets(), [1, 3, 9])
+        self.assertEqual(SuccessiveHalving(self.bp, self.trial, 27, 10 / 9, 10).budgets(), [10 / 9, 10 / 3, 10])
+        self.assertEqual(SuccessiveHalving(self.bp, self.trial, 9, 1).budgets(), [1, 3, 9])
+
+    def test_top_fraction_is_promoted(self):
+        scheduler = SuccessiveHalving(self.bp, self.trial, 27, 1, 9, eta=3, custom_dir=self.dir)
+        best, score = scheduler.run()[0]
+        self.assertEqual([len(rung) for rung in scheduler.rungs], [27, 9, 3])
+        self.assertEqual(len(self.calls), 39)
+        self.assertEqual(score, min(score for _, score in scheduler.rungs[0]) - 1 + 1 / 9)
+        promoted = {hparams.id for hparams, _ in scheduler.rungs[0][:9]}
+        self.assertEqual({hparams.id for hparams, _ in scheduler.rungs[1]}, promoted)
+
+    def test_rungs_are_saved(self):
+        scheduler = SuccessiveHalving(self.bp, self.trial, 9, 1, 3, custom_dir=self.dir)
+        scheduler.run()
+        self.assertEqual(len(HyperParameters.saved_ids(self.dir / "rung_0")), 9)
+        best, score = scheduler.rungs[1][0]
+        saved = HyperParameters(best.id, blueprint=self.bp).load(self.dir / "rung_1")
+        self.assertEqual(saved, best)
+        self.assertNotIn("budget", saved)
+        with open(self.dir / "rung_1" / "scores.json") as f:
+            self.assertEqual(json.load(f)[0], {"id": best.id, "budget": 3, "score": score})
+        self.assertEqual(list(scheduler.records[best.id].items())[-1], (3, score))
+
+    def test_configurations_are_not_changed(self):
+        bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, a=CLASSES, budget=int)
+        scheduler = SuccessiveHalving(bp, lambda hparams, budget: CLASSES.index(hparams["a"][0]), 3, 0.5, 1.5, custom_dir=self.dir, budget=2)
+        best, _ = scheduler.run()[0]
+        self.assertEqual(scheduler.budgets(), [0.5, 1.5]) # Fractional budgets do not clash with the 'budget' hyper-parameter
+        for hparams, _ in scheduler.rungs[0]:
+            self.assertEqual(hparams.to_dict(), {"a": hparams["a"][0], "budget": 2})
+        self.assertEqual(scheduler.records[best.id].keys(), {0.5, 1.5})
+
+    def test_max_mode(self):
+        scheduler = SuccessiveHalving(self.bp, lambda hparams, budget: -self.trial(hparams, budget), 9, 1, 3, mode="max", custom_dir=self.dir)
+        rung = scheduler.run()
+        self.assertEqual(rung[0][1], max(score for _, score in rung))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+class TestHyperband(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, a=CLASSES, b=CLASSES)
+        self.dir = Path(__file__).parent / "TEMP"
+
+    def test_brackets(self):
+        (best, score), brackets = hyperband(self.bp, lambda hparams, budget: CLASSES.index(hparams["a"][0]) / budget, 1, 9, custom_dir=self.dir)
+        self.assertEqual([len(b.rungs[0]) for b in brackets], [9, 5, 3])
+        self.assertEqual([b.budgets()[0] for b in brackets], [1, 3, 9])
+        self.assertEqual(score, 0)
+        self.assertTrue((self.dir / "bracket_2" / "rung_0").is_dir())
+
+    def test_default_directory_in_fresh_process(self):
+        self.dir.mkdir()
+        code = (f"import sys; sys.path.insert(0, {str(Path(__file__).parent.parent)!r}); from BluePrint import BluePrint; from Scheduler import hyperband; "
+                "bp = BluePrint('test', skip_prompts=True, x=int); print(hyperband(bp, lambda hparams, budget: 1 / budget, 1, 3, x=1)[0][1])")
+        subprocess.run([sys.executable, "-c", code], cwd=self.dir, capture_output=True, text=True, check=True)
+        self.assertTrue((self.dir / "HyperParameters" / "bracket_0").is_dir())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
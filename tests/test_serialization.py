@@ -0,0 +1,86 @@
+import unittest, os, json
+
+import Serialization
+from BluePrint import BluePrint, Range
+from HyperParameters import HyperParameters
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+class TestSerialization(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int, lr=Range(0.0, 1.0),
+                            module=Dummy_Module, list=[Dummy_Module.A, Dummy_Module.B])
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, int=i, lr=i / 10, list=Dummy_Module.B) for i in range(5)]
+
+    def test_round_trip_in_every_format(self):
+        for format in ["json", "binary"]:
+            bp = Serialization.loads(Serialization.dumps(self.bp, format))
+            self.assertEqual(bp, self.bp, format)
+            self.assertTrue(bp.check("lr", 0.5))
+            hparams = Serialization.loads(Serialization.dumps(self.configs[3], format), blueprint=bp)
+            self.assertEqual(hparams, self.configs[3], format)
+            self.assertEqual(hparams.id, "test_3")
+
+    def test_json_matches_saved_files(self):
+        self.configs[2].save(self.dir)
+        self.assertEqual(Serialization.load(self.dir / "HyperParameters_test_2.json", self.bp), self.configs[2])
+        Serialization.dump(self.configs[1], self.dir / "HyperParameters_test_1.json")
+        self.assertEqual(HyperParameters("test_1", self.bp).load(self.dir), self.configs[1])
+
+    def test_stream_resolves_blueprints(self):
+        for format in ["json", "binary"]:
+            path = self.dir / f"stream.{format}"
+            self.assertEqual(Serialization.dump_many([self.bp, *self.configs], path, format), 6)
+            objs = Serialization.load_many(path)
+            bp = next(objs)
+            self.assertEqual(bp, self.bp)
+            loaded = list(objs)
+            self.assertEqual(loaded, self.configs, format)
+            self.assertTrue(all(h.blueprint is bp for h in loaded))
+
+    def test_stream_without_blueprint(self):
+        HyperParameters.save_many(self.configs, self.dir / "configs.jsonl")
+        self.assertRaises(ValueError, next, Serialization.load_many(self.dir / "configs.jsonl"))
+        self.assertEqual(list(Serialization.load_many(self.dir / "configs.jsonl", self.bp)), self.configs)
+
+    def test_newer_schema_and_truncated_streams_are_rejected(self):
+        data = json.dumps({**Serialization.to_template(self.configs[0]), "__version__": Serialization.SCHEMA_VERSION + 1}).encode()
+        self.assertRaises(ValueError, Serialization.loads, data, self.bp)
+        path = self.dir / "stream.bin"
+        Serialization.dump_many(self.configs, path, "binary")
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 3)
+        self.assertRaises(ValueError, list, Serialization.load_many(path, self.bp))
+        self.assertRaises(ValueError, Serialization.dumps, self.bp, "xml")
+        data = Serialization.dumps(self.configs[0], "binary")
+        for size in [2, 8, len(data) - 3]: # Within the magic bytes, the header and the record
+            self.assertRaises(ValueError, Serialization.loads, data[:size], self.bp)
+
+    def test_delta_files_resolve_their_base(self):
+        overlay = HyperParameters("overlay", base=self.configs[0], int=7)
+        overlay.save(self.dir, delta=True)
+        loaded = Serialization.load(self.dir / "HyperParameters_overlay.json", self.bp)
+        self.assertEqual(loaded, overlay)
+        self.assertEqual(loaded._base.id, "test_0")
+        with open(self.dir / "HyperParameters_overlay.json", "rb") as f:
+            data = f.read()
+        self.assertRaises(ValueError, Serialization.loads, data, self.bp)
+        self.assertEqual(Serialization.loads(data, self.bp, bases={"test_0": self.configs[0]})["lr"], 0.0)
+
+    def test_serializers_are_abstract(self):
+        class Incomplete(Serialization.Serializer):
+            def dumps(self, template):
+                return b""
+        self.assertRaises(TypeError, Incomplete)
+
+    def tearDown(self):
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest, os, json, time
+
+import Stats
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from Utils import class_from_string
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+class Optimizer:
+    def __init__(self, lr=0.1):
+        pass
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        Stats.reset()
+        Stats.enable()
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int, list=[Dummy_Module.A, Optimizer])
+
+    def test_check_calls_and_failures(self):
+        self.bp.check("int", 1)
+        self.bp.check("int", 0.5)
+        self.bp.check("list", Dummy_Module.B)
+        counters = Stats.snapshot()["counters"]
+        self.assertEqual(counters["blueprint.check"], 3)
+        self.assertEqual(counters["blueprint.check.failures"], 2)
+
+    def test_fetch_class_hyperparameters(self):
+        hparams = HyperParameters("test", blueprint=self.bp, list=Optimizer)
+        hparams["list"], hparams["list"]
+        counters = Stats.snapshot()["counters"]
+        self.assertEqual(counters["hyperparameters.fetch_class_hyperparameters"], 2)
+        self.assertEqual(counters["hyperparameters.fetch_class_hyperparameters.misses"], 1)
+
+    def test_save_and_load_bytes(self):
+        hparams = HyperParameters("test", blueprint=self.bp, int=1, list=Dummy_Module.A)
+        hparams.save(self.dir)
+        HyperParameters("test", blueprint=self.bp).load(self.dir)
+        timers = Stats.snapshot()["timers"]
+        size = (self.dir / "HyperParameters_test.json").stat().st_size
+        self.assertEqual((timers["hyperparameters.save"]["calls"], timers["hyperparameters.save"]["bytes"]), (1, size))
+        self.assertEqual((timers["hyperparameters.load"]["calls"], timers["hyperparameters.load"]["bytes"]), (1, size))
+
+    def test_class_from_string_resolutions(self):
+        class_from_string("decimal.Decimal")
+        class_from_string("decimal.Decimal")
+        snapshot = Stats.snapshot()
+        self.assertLessEqual(snapshot["timers"].get("utils.class_from_string", {"calls": 0})["calls"], 1)
+        self.assertGreaterEqual(snapshot["counters"]["utils.class_from_string.cached"], 1)
+
+    def test_disabled_records_nothing(self):
+        Stats.disable()
+        self.bp.check("int", 1)
+        self.assertEqual(Stats.snapshot(), {"counters": {}, "timers": {}})
+
+    def test_periodic_dump(self):
+        self.bp.check("int", 1)
+        Stats.start_periodic_dump(self.dir / "stats.jsonl", interval=0.01)
+        time.sleep(0.05)
+        Stats.stop_periodic_dump()
+        with open(self.dir / "stats.jsonl") as f:
+            snapshots = [json.loads(line) for line in f]
+        self.assertGreaterEqual(len(snapshots), 2)
+        self.assertEqual(snapshots[-1]["counters"]["blueprint.check"], 1)
+
+    def tearDown(self):
+        Stats.disable()
+        Stats.reset()
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
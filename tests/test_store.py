@@ -0,0 +1,99 @@
+import unittest, os
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+from Store import HyperParametersStore, FingerprintIndex
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+class TestHyperParametersStore(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            batch_size=int, lr=float, name=str, list=[Dummy_Module.A, Dummy_Module.B])
+        self.configs = [HyperParameters(f"test_{i}", blueprint=self.bp, batch_size=2 ** i, lr=0.1 * i, name=f"run{i % 2}",
+                                        list=Dummy_Module.A if i % 2 else Dummy_Module.B) for i in range(8)]
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.store = HyperParametersStore(self.dir / "test.db").insert_many(self.configs)
+
+    def test_bulk_insert_and_lookup_by_id(self):
+        self.assertEqual(len(self.store), 8)
+        self.assertIn("test_3", self.store)
+        self.assertEqual(self.store.load("test_3", self.bp), self.configs[3])
+        self.assertRaises(KeyError, self.store.load, "BAD_ID", self.bp)
+
+    def test_insert_replaces_existing_id(self):
+        hparams = HyperParameters("test_0", blueprint=self.bp, batch_size=1000)
+        self.store.insert(hparams)
+        self.assertEqual(len(self.store), 8)
+        self.assertEqual(self.store.load("test_0", self.bp), hparams)
+        self.assertEqual(self.store.query(("lr", "==", 0.0)), [])
+
+    def test_query_by_value(self):
+        self.assertEqual(self.store.query(("list", "==", Dummy_Module.A), ("batch_size", ">=", 16)), ["test_5", "test_7"])
+        self.assertEqual(self.store.query(("name", "!=", "run0"), ("batch_size", "<", 4)), ["test_1"])
+        self.assertEqual(self.store.query(), self.store.ids())
+        self.assertRaises(ValueError, self.store.query, ("lr", "~", 0.1))
+
+    def test_json_export_and_import(self):
+        self.store.export_json(self.dir)
+        hparams = HyperParameters("test_4", blueprint=self.bp).load(self.dir)
+        self.assertEqual(hparams, self.configs[4])
+        with HyperParametersStore(self.dir / "imported.db") as store:
+            store.import_json(self.bp, self.dir)
+            self.assertEqual(store.ids(), self.store.ids())
+            self.assertEqual(store.query(("list", "==", Dummy_Module.B)), ["test_0", "test_2", "test_4", "test_6"])
+
+    def test_import_resolves_delta_saves(self):
+        HyperParameters("overlay", base=self.configs[3], lr=0.5).save(self.dir, delta=True)
+        with HyperParametersStore(self.dir / "imported.db") as store:
+            store.import_json(self.bp, self.dir)
+            self.assertEqual(store.ids(), ["overlay", "test_3"])
+            self.assertEqual(store.query(("batch_size", "==", 8), ("lr", "==", 0.5)), ["overlay"])
+
+    def tearDown(self):
+        self.store.close()
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+class TestFingerprintIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int)
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+
+    def test_index_persists_across_instances(self):
+        index = FingerprintIndex(self.dir / "index")
+        self.assertNotIn(HyperParameters("a", blueprint=self.bp, int=1), index)
+        index.add(HyperParameters("a", blueprint=self.bp, int=1))
+        index.add(HyperParameters("b", blueprint=self.bp, int=1)) # Same contents, not added again
+        self.assertEqual(len(FingerprintIndex(self.dir / "index")), 1)
+        self.assertIn(HyperParameters("c", blueprint=self.bp, int=1), FingerprintIndex(self.dir / "index"))
+
+    def test_index_sees_additions_from_other_instances(self):
+        first, second = FingerprintIndex(self.dir / "index"), FingerprintIndex(self.dir / "index")
+        fingerprint = second.add(HyperParameters("a", blueprint=self.bp, int=2))
+        self.assertIn(fingerprint, first)
+
+    def test_index_maps_fingerprints_to_ids(self):
+        index = FingerprintIndex(self.dir / "index")
+        index.add(HyperParameters("a", blueprint=self.bp, int=1))
+        index.add(HyperParameters("a", blueprint=self.bp, int=2)) # Same id, other contents
+        fingerprint = index.add(HyperParameters("b", blueprint=self.bp, int=3).fingerprint())
+        reloaded = FingerprintIndex(self.dir / "index")
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.get(HyperParameters("c", blueprint=self.bp, int=2)), "a")
+        self.assertIsNone(reloaded.get(fingerprint))
+        self.assertEqual(reloaded.get(HyperParameters("c", blueprint=self.bp, int=4), "missing"), "missing")
+
+    def tearDown(self):
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
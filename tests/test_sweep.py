@@ -0,0 +1,91 @@
+import unittest, itertools, importlib.util
+
+from BluePrint import BluePrint, Range
+from HyperParameters import HyperParameters
+from Sweep import grid_search, random_search, grid_size, sample_batch, rows
+from tests import Dummy_Module as Dummy_Module
+
+class TestGridSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int,
+                            a=[Dummy_Module.A, Dummy_Module.B], b=[Dummy_Module.A, Dummy_Module.B, Dummy_Module.C])
+
+    def test_grid_covers_cartesian_product(self):
+        combinations = [(h["a"][0], h["b"][0]) for h in grid_search(self.bp)]
+        self.assertEqual(combinations, list(itertools.product(self.bp["a"], self.bp["b"])))
+        self.assertEqual(grid_size(self.bp), 6)
+
+    def test_fixed_values_are_not_enumerated(self):
+        hparams = list(grid_search(self.bp, int=3, a=Dummy_Module.B))
+        self.assertEqual(len(hparams), 3)
+        self.assertTrue(all(h["int"] == 3 and h["a"][0] is Dummy_Module.B for h in hparams))
+
+    def test_shards_are_disjoint_and_complete(self):
+        shards = [[h.id for h in grid_search(self.bp, shard_index=i, num_shards=4)] for i in range(4)]
+        ids = [id for shard in shards for id in shard]
+        self.assertEqual(sorted(ids), sorted(h.id for h in grid_search(self.bp)))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_start_stop_slice(self):
+        self.assertEqual([h.id for h in grid_search(self.bp, start=2, stop=4)], ["grid_2", "grid_3"])
+
+    def test_invalid_shard_index(self):
+        self.assertRaises(ValueError, next, grid_search(self.bp, shard_index=2, num_shards=2))
+
+class TestRandomSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            a=[Dummy_Module.A, Dummy_Module.B], b=[Dummy_Module.A, Dummy_Module.B, Dummy_Module.C])
+
+    def test_samples_are_reproducible(self):
+        first = [(h.id, h["a"], h["b"]) for h in random_search(self.bp, 10, seed=1)]
+        second = [(h.id, h["a"], h["b"]) for h in random_search(self.bp, 10, seed=1)]
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 10)
+
+    def test_shards_match_unsharded_sweep(self):
+        full = {h.id: (h["a"], h["b"]) for h in random_search(self.bp, 10, seed=1)}
+        sharded = {h.id: (h["a"], h["b"]) for i in range(3) for h in random_search(self.bp, 10, seed=1, shard_index=i, num_shards=3)}
+        self.assertEqual(full, sharded)
+
+    def test_samples_satisfy_blueprint(self):
+        for h in random_search(self.bp, 20, seed=2):
+            self.assertTrue(self.bp.check("a", h["a"][0]))
+            self.assertTrue(self.bp.check("b", h["b"][0]))
+
+    def test_ranges_are_sampled(self):
+        self.bp["lr"], self.bp["layers"] = Range(1e-4, 1e-1, log=True), Range(1, 4, integer=True)
+        for h in random_search(self.bp, 20, seed=3):
+            self.assertTrue(self.bp.check("lr", h["lr"]))
+            self.assertTrue(self.bp.check("layers", h["layers"]))
+        self.assertEqual(grid_size(self.bp), 6) # Ranges are not enumerated
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "NumPy not installed")
+class TestSampleBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int,
+                            a=[Dummy_Module.A, Dummy_Module.B], lr=Range(1e-4, 1e-1, log=True), batch_size=Range(16, 256, integer=True, q=16))
+
+    def test_batch_satisfies_blueprint(self):
+        batch = sample_batch(self.bp, 1000, seed=1, int=3)
+        self.assertEqual(set(batch), {"a", "lr", "batch_size", "int"})
+        self.assertTrue(all(len(column) == 1000 for column in batch.values()))
+        self.assertEqual(self.bp.check_many(rows(batch)), [True] * 1000)
+
+    def test_batch_is_reproducible(self):
+        first, second = sample_batch(self.bp, 100, seed=2), sample_batch(self.bp, 100, seed=2)
+        self.assertEqual(list(rows(first)), list(rows(second)))
+
+    def test_rows_mask_and_python_types(self):
+        batch = sample_batch(self.bp, 100, seed=3)
+        keep = batch["batch_size"] <= 64
+        selected = list(rows(batch, keep))
+        self.assertEqual(len(selected), int(keep.sum()))
+        self.assertTrue(all(type(values["batch_size"]) is int and values["batch_size"] <= 64 for values in selected))
+        HyperParameters("batch_0", self.bp, **selected[0])
+
+if __name__ == '__main__':
+    unittest.main()
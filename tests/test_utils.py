@@ -0,0 +1,56 @@
+import unittest, sys, pickle, copy
+
+import Utils
+from Utils import class_from_string, qualified_name, resolve_class, LazyClass
+from tests import Dummy_Module as Dummy_Module
+
+class TestClassFromString(unittest.TestCase):
+
+    def test_builtin(self):
+        self.assertIs(class_from_string("int"), int)
+
+    def test_module_class(self):
+        self.assertIs(class_from_string("tests.Dummy_Module.A"), Dummy_Module.A)
+        self.assertIs(class_from_string(qualified_name(Dummy_Module.B)), Dummy_Module.B)
+
+    def test_resolution_is_cached(self):
+        class_from_string("collections.OrderedDict")
+        self.assertIn("collections.OrderedDict", Utils._classes)
+
+    def test_unknown_class(self):
+        self.assertRaises(ImportError, class_from_string, "tests.Dummy_Module.Z")
+        self.assertRaises(ImportError, class_from_string, "not_a_module.Z")
+
+class TestLazyClass(unittest.TestCase):
+
+    def test_lazy_class_does_not_import(self):
+        sys.modules.pop("xml.dom.minidom", None)
+        cls = class_from_string("xml.dom.minidom.Document", lazy=True)
+        self.assertIsInstance(cls, LazyClass)
+        self.assertEqual(qualified_name(cls), "xml.dom.minidom.Document")
+        self.assertNotIn("xml.dom.minidom", sys.modules)
+        self.assertEqual(cls, LazyClass("xml.dom.minidom.Document"))
+
+    def test_lazy_class_resolves_on_use(self):
+        cls = LazyClass("tests.Dummy_Module.C")
+        self.assertIsInstance(cls(), Dummy_Module.C)
+        self.assertIs(cls.resolve(), Dummy_Module.C)
+        self.assertIs(resolve_class(cls), Dummy_Module.C)
+
+    def test_lazy_class_only_equals_lazy_classes(self):
+        cls = LazyClass("tests.Dummy_Module.C")
+        self.assertNotEqual(cls, Dummy_Module.C) # Classes hash by identity, so equality would break sets and dicts
+        self.assertEqual({cls}, {LazyClass("tests.Dummy_Module.C")})
+        self.assertNotIn(cls, {Dummy_Module.C})
+
+    def test_lazy_class_can_be_pickled_and_copied(self):
+        sys.modules.pop("xml.dom.minidom", None)
+        cls = LazyClass("xml.dom.minidom.Document")
+        for other in (pickle.loads(pickle.dumps(cls)), copy.copy(cls), copy.deepcopy(cls)):
+            self.assertEqual(other, cls)
+        self.assertNotIn("xml.dom.minidom", sys.modules)
+        self.assertIs(pickle.loads(pickle.dumps(LazyClass("tests.Dummy_Module.C"))).resolve(), Dummy_Module.C)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest, os, time, json
+
+import Stats
+from BluePrint import BluePrint, Range
+from HyperParameters import HyperParameters
+from Watcher import Watcher
+from tests import Dummy_Module as Dummy_Module
+from pathlib import Path
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = Path(__file__).parent / "TEMP"
+        self.dir.mkdir(exist_ok=True)
+        self.bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True,
+                            lr=float, epochs=int, list=[Dummy_Module.A, Dummy_Module.B])
+        self.bp.save(self.dir)
+        self.hparams = HyperParameters("test", blueprint=self.bp, lr=0.1, epochs=10, list=Dummy_Module.A)
+        self.hparams.save(self.dir)
+        self.watcher = Watcher(self.hparams, custom_dir=self.dir, blueprint_dir=self.dir, interval=0.01)
+        self.calls = []
+        self.watcher.subscribe(lambda hparams, keys: self.calls.append(keys))
+        self.other = HyperParameters("test", blueprint=self.bp).load(self.dir) # E.g. another process editing the file
+
+    def test_unchanged_file_is_not_parsed(self):
+        Stats.enable()
+        try:
+            self.assertEqual(self.watcher.poll(), set())
+            self.assertNotIn("hyperparameters.load", Stats.snapshot()["timers"])
+        finally:
+            Stats.disable()
+            Stats.reset()
+
+    def test_changed_values_are_swapped_in(self):
+        self.other["lr"], self.other["list"] = 0.01, Dummy_Module.B
+        self.other.save(self.dir)
+        self.assertEqual(self.watcher.poll(), {"lr", "list"})
+        self.assertEqual((self.hparams["lr"], self.hparams["list"][0]), (0.01, Dummy_Module.B))
+        self.assertEqual(self.calls, [{"lr", "list"}])
+        self.assertEqual(self.watcher.poll(), set())
+
+    def test_change_log_is_watched(self):
+        self.other["epochs"] = 20
+        self.other.save(self.dir, changelog=True)
+        self.assertEqual(self.watcher.poll(), {"epochs"})
+        self.assertEqual(self.hparams["epochs"], 20)
+
+    def test_invalid_values_are_rejected(self):
+        with open(self.dir / "HyperParameters_test.json", "w") as f:
+            json.dump({"id": "test", "__classes__": [], "__primitives__": [["lr", 0.5], ["epochs", "many"]]}, f)
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertEqual((self.hparams["lr"], self.hparams["epochs"]), (0.1, 10))
+        self.assertEqual(self.calls, [])
+
+    def test_blueprint_is_reloaded_before_checking(self):
+        changed_bp = BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=Range(0.0, 1.0), list=[Dummy_Module.A])
+        changed_bp.save(self.dir)
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertEqual(self.hparams.blueprint, changed_bp)
+        self.assertNotIn("epochs", self.hparams.blueprint) # Removed from the file
+        self.assertEqual(self.bp["lr"], float) # Shared BluePrint is left as it was
+        with open(self.dir / "HyperParameters_test.json", "w") as f: # Valid for the original BluePrint, not the reloaded one
+            json.dump({"id": "test", "__classes__": [], "__primitives__": [["lr", 2.0]]}, f)
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertEqual(self.hparams["lr"], 0.1)
+
+    def test_blueprint_rejecting_current_values_is_not_swapped_in(self):
+        BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=float, epochs=int, list=[Dummy_Module.B]).save(self.dir)
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertIs(self.hparams.blueprint, self.bp)
+
+    def test_unreadable_blueprint_is_retried(self):
+        with open(self.dir / "BluePrint_test.json", "w") as f: # E.g. still being written
+            f.write('{"id": "test", "__modules__": [')
+        self.assertEqual(self.watcher.poll(), set())
+        self.assertIs(self.hparams.blueprint, self.bp)
+        BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, lr=Range(0.0, 1.0), epochs=int, list=[Dummy_Module.A]).save(self.dir)
+        self.other["epochs"] = 20
+        self.other.save(self.dir)
+        self.assertEqual(self.watcher.poll(), {"epochs"})
+        self.assertEqual(self.hparams.blueprint["lr"], Range(0.0, 1.0))
+
+    def test_background_polling(self):
+        with self.watcher:
+            self.other["epochs"] = 5
+            self.other.save(self.dir)
+            deadline = time.time() + 5
+            while not self.calls and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(self.calls, [{"epochs"}])
+        self.assertEqual(self.hparams["epochs"], 5)
+
+    def tearDown(self):
+        self.watcher.stop()
+        for name in os.listdir(self.dir):
+            (self.dir / name).unlink()
+        self.dir.rmdir()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest, os, sys, time, shutil, subprocess, multiprocessing
+
+from BluePrint import BluePrint
+from HyperParameters import HyperParameters
+import WorkQueue as WorkQueueModule
+from WorkQueue import WorkQueue
+from pathlib import Path
+
+TEMP = Path(__file__).parent / "TEMP"
+
+def blueprint():
+    return BluePrint("test", load_existing=False, custom_dir=None, skip_prompts=True, int=int)
+
+def square(hparams):
+    if hparams["int"] == 3:
+        raise ValueError("Bad trial")
+    time.sleep(0.01)
+    return hparams["int"] ** 2
+
+def worker():
+    WorkQueue("test", custom_dir=TEMP).run(square, blueprint())
+
+class TestWorkQueue(unittest.TestCase):
+
+    def setUp(self):
+        TEMP.mkdir(exist_ok=True)
+        self.bp = blueprint()
+        self.queue = WorkQueue("test", custom_dir=TEMP, stale_after=60)
+        self.assertEqual(self.queue.put_many(HyperParameters(f"test_{i}", blueprint=self.bp, int=i) for i in range(20)), 20)
+
+    def test_claim_complete_and_fail(self):
+        claim = self.queue.claim(self.bp)
+        self.assertEqual(claim.id, f"test_{claim.hparams['int']}")
+        self.assertEqual(self.queue.counts(), {"pending": 19, "claimed": 1, "done": 0, "failed": 0})
+        self.assertTrue(claim.complete(0))
+        self.assertFalse(claim.heartbeat())
+        failed = self.queue.claim(self.bp)
+        self.assertNotEqual(failed.id, claim.id)
+        self.assertTrue(failed.fail(ValueError("Bad trial")))
+        self.assertEqual(self.queue.counts(), {"pending": 18, "claimed": 0, "done": 1, "failed": 1})
+        results = {r.id: r for r in self.queue.results()}
+        self.assertEqual(results[claim.id].result, 0)
+        self.assertIn("Bad trial", results[failed.id].error)
+
+    def test_stale_claims_are_requeued(self):
+        claim = self.queue.claim(self.bp)
+        self.assertEqual(self.queue.requeue_stale(), [])
+        old = time.time() - 120
+        os.utime(claim.path, (old, old))
+        self.assertEqual(self.queue.requeue_stale(), [claim.id])
+        self.assertFalse(claim.heartbeat())
+        self.assertFalse(claim.complete(0)) # Lost, the configuration runs again
+        self.assertIn(claim.id, self.queue.ids("pending"))
+        self.assertEqual(list(self.queue.results()), [])
+
+    def test_lost_claim_does_not_touch_new_claim(self):
+        queue = WorkQueue("single", custom_dir=TEMP, stale_after=60)
+        queue.put(HyperParameters("test_0", blueprint=self.bp, int=0))
+        lost = queue.claim(self.bp)
+        old = time.time() - 120
+        os.utime(lost.path, (old, old))
+        queue.requeue_stale()
+        claim = queue.claim(self.bp) # Same configuration, claimed again elsewhere
+        self.assertEqual(claim.id, lost.id)
+        self.assertEqual(queue.requeue_stale(), []) # Claiming refreshed its modification time
+        self.assertFalse(lost.heartbeat())
+        self.assertTrue(claim.complete(1))
+        self.assertFalse(lost.complete(0))
+        self.assertEqual(queue.counts()["done"], 1)
+        self.assertEqual([(r.id, r.result) for r in queue.results()], [(claim.id, 1)])
+
+    def test_claims_are_read_in_batches(self):
+        batch, WorkQueueModule.CLAIM_BATCH = WorkQueueModule.CLAIM_BATCH, 3
+        try:
+            ids = [self.queue.claim(self.bp).id for _ in range(20)]
+        finally:
+            WorkQueueModule.CLAIM_BATCH = batch
+        self.assertEqual(sorted(ids), sorted(f"test_{i}" for i in range(20)))
+        self.assertIsNone(self.queue.claim(self.bp))
+
+    def test_empty_queue_requeues_stale_claims(self):
+        claims = [self.queue.claim(self.bp) for _ in range(20)]
+        self.assertIsNone(self.queue.claim(self.bp))
+        old = time.time() - 120
+        os.utime(claims[5].path, (old, old))
+        self.assertEqual(self.queue.claim(self.bp).id, claims[5].id)
+
+    def test_workers_in_several_processes(self):
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=worker) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+        self.assertEqual(self.queue.counts(), {"pending": 0, "claimed": 0, "done": 19, "failed": 1})
+        results = {r.id: r for r in self.queue.results()}
+        self.assertEqual({id: r.result for id, r in results.items() if r.error is None}, {f"test_{i}": i ** 2 for i in range(20) if i != 3})
+        self.assertIn("Bad trial", results["test_3"].error)
+
+    def test_default_directory_in_fresh_process(self):
+        code = f"import sys; sys.path.insert(0, {str(Path(__file__).parent.parent)!r}); from WorkQueue import WorkQueue; print(WorkQueue('sweep').root)"
+        root = subprocess.run([sys.executable, "-c", code], cwd=TEMP, capture_output=True, text=True, check=True).stdout.strip()
+        self.assertEqual(Path(root), TEMP.resolve() / "HyperParameters" / "queue_sweep")
+        self.assertTrue(Path(root, "pending").is_dir())
+
+    def tearDown(self):
+        shutil.rmtree(TEMP)
+
+
+if __name__ == '__main__':
+    unittest.main()